@@ -0,0 +1,33 @@
+"""result_elements
+
+Revision ID: 0c7d52e8a4f9
+Revises: b3e9d1742f0c
+Create Date: 2026-10-19 11:20:45.906312
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0c7d52e8a4f9'
+down_revision = 'b3e9d1742f0c'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.create_table('result_element',
+        sa.Column('result_id', sa.Integer(), nullable=False),
+        sa.Column('index', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=True),
+        sa.ForeignKeyConstraint(['result_id'], ['result.id'], name=op.f('fk_result_element_result_id_result'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('result_id', 'index', name=op.f('pk_result_element'))
+    )
+    op.add_column('result', sa.Column('has_elements', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    op.drop_column('result', 'has_elements')
+    op.drop_table('result_element')
@@ -0,0 +1,26 @@
+"""report_keyset_indexes
+
+Revision ID: 2c7e90b5d1f4
+Revises: 8d41c6e9a2b3
+Create Date: 2026-10-19 16:48:51.027384
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2c7e90b5d1f4'
+down_revision = '8d41c6e9a2b3'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_index('ix_execution_workflow_id_timestamp_id', 'execution', ['workflow_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_execution_status_history_workflow_id_timestamp_id', 'execution_status_history', ['workflow_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_execution_status_history_workflow_id_timestamp_id', table_name='execution_status_history')
+    op.drop_index('ix_execution_workflow_id_timestamp_id', table_name='execution')
@@ -0,0 +1,26 @@
+"""status_history_change_seq
+
+Revision ID: 4a8f1d2e6c93
+Revises: 9e2a5c7f3b61
+Create Date: 2026-10-19 18:05:12.884120
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a8f1d2e6c93'
+down_revision = '9e2a5c7f3b61'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('execution_status_history', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.create_index('ix_execution_status_history_workflow_id_change_seq', 'execution_status_history', ['workflow_id', 'change_seq'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_execution_status_history_workflow_id_change_seq', table_name='execution_status_history')
+    op.drop_column('execution_status_history', 'change_seq')
@@ -0,0 +1,35 @@
+"""result_references
+
+Revision ID: 4e8b2c61d9a3
+Revises: 0c7d52e8a4f9
+Create Date: 2026-10-19 12:02:17.531894
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4e8b2c61d9a3'
+down_revision = '0c7d52e8a4f9'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column('result', sa.Column('reference_type', sa.Text(), nullable=True))
+    op.add_column('result', sa.Column('reference_begin', sa.Integer(), nullable=True))
+    op.add_column('result', sa.Column('reference_result_id', sa.Integer(), nullable=True))
+    op.add_column('result', sa.Column('reference_indexes', postgresql.JSONB(), nullable=True))
+    op.create_index(op.f('ix_result_reference_result_id'), 'result', ['reference_result_id'], unique=False)
+    op.create_foreign_key(op.f('fk_result_reference_result_id_result'), 'result', 'result', ['reference_result_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_constraint(op.f('fk_result_reference_result_id_result'), 'result', type_='foreignkey')
+    op.drop_index(op.f('ix_result_reference_result_id'), table_name='result')
+    op.drop_column('result', 'reference_indexes')
+    op.drop_column('result', 'reference_result_id')
+    op.drop_column('result', 'reference_begin')
+    op.drop_column('result', 'reference_type')
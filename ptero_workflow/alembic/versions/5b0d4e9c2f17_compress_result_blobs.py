@@ -0,0 +1,68 @@
+"""compress_result_blobs
+
+Revision ID: 5b0d4e9c2f17
+Revises: 7c915ab3e268
+Create Date: 2026-10-19 14:26:51.093372
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5b0d4e9c2f17'
+down_revision = '7c915ab3e268'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import json
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import zlib
+
+
+# the encoding of CompressedJSON when this migration was written
+def _encode(data):
+    canonical_json = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    if len(canonical_json) >= 1024:
+        return b'z' + zlib.compress(canonical_json, 6)
+    else:
+        return b'j' + canonical_json
+
+
+def _decode(value):
+    value = bytes(value)
+    if value[:1] == b'z':
+        return json.loads(zlib.decompress(value[1:]))
+    else:
+        return json.loads(value[1:])
+
+
+def _blobs(from_type, to_type):
+    return sa.table('result_blob',
+        sa.column('hash', sa.Text()),
+        sa.column('data', from_type),
+        sa.column('new_data', to_type),
+    )
+
+
+def _convert(from_type, to_type, encode):
+    op.add_column('result_blob', sa.Column('new_data', to_type, nullable=True))
+
+    connection = op.get_bind()
+    blobs = _blobs(from_type, to_type)
+    rows = connection.execution_options(stream_results=True).execute(
+            sa.select([blobs.c.hash, blobs.c.data]).where(
+                blobs.c.data.isnot(None)))
+    for blob_hash, data in rows:
+        connection.execute(blobs.update().where(blobs.c.hash == blob_hash
+            ).values(new_data=encode(data)))
+
+    op.drop_column('result_blob', 'data')
+    op.alter_column('result_blob', 'new_data', new_column_name='data')
+
+
+def upgrade():
+    _convert(postgresql.JSONB(), sa.LargeBinary(), _encode)
+
+
+def downgrade():
+    _convert(sa.LargeBinary(), postgresql.JSONB(), _decode)
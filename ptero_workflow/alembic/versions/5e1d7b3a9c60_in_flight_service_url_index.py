@@ -0,0 +1,28 @@
+"""in_flight_service_url_index
+
+Revision ID: 5e1d7b3a9c60
+Revises: 6d3b8f0a2e57
+Create Date: 2026-10-19 21:12:40.318225
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5e1d7b3a9c60'
+down_revision = '6d3b8f0a2e57'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.execute("""
+        CREATE INDEX ix_execution_in_flight_service_url
+        ON execution ((data ->> 'serviceUrl'))
+        WHERE status IN ('new', 'scheduled', 'submitted', 'running')
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_execution_in_flight_service_url', table_name='execution')
@@ -0,0 +1,29 @@
+"""service_url_pools
+
+Revision ID: 6a0c3f5e1b27
+Revises: 89b1fb28bb6c
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6a0c3f5e1b27'
+down_revision = '89b1fb28bb6c'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column('job', sa.Column('service_urls', postgresql.JSON(), nullable=True))
+    op.add_column('job', sa.Column('service_pool', sa.Text(), nullable=True))
+    op.alter_column('job', 'service_url', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade():
+    op.alter_column('job', 'service_url', existing_type=sa.Text(), nullable=False)
+    op.drop_column('job', 'service_pool')
+    op.drop_column('job', 'service_urls')
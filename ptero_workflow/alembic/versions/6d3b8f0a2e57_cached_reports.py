@@ -0,0 +1,33 @@
+"""cached_reports
+
+Revision ID: 6d3b8f0a2e57
+Revises: 4a8f1d2e6c93
+Create Date: 2026-10-19 19:12:40.217305
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6d3b8f0a2e57'
+down_revision = '4a8f1d2e6c93'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('cached_report',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('workflow_id', sa.Integer(), nullable=False),
+        sa.Column('report_type', sa.Text(), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('gzipped_body', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['workflow_id'], ['workflow.id'], name=op.f('fk_cached_report_workflow_id_workflow'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_cached_report')),
+        sa.UniqueConstraint('workflow_id', 'report_type', name=op.f('uq_cached_report_workflow_id'))
+    )
+
+
+def downgrade():
+    op.drop_table('cached_report')
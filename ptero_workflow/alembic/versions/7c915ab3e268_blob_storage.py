@@ -0,0 +1,57 @@
+"""blob_storage
+
+Revision ID: 7c915ab3e268
+Revises: d25e8f1a7c40
+Create Date: 2026-10-19 13:48:19.605227
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7c915ab3e268'
+down_revision = 'd25e8f1a7c40'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import gzip
+import os
+import sqlalchemy as sa
+
+
+result_blob = sa.table('result_blob',
+    sa.column('hash', sa.Text()),
+    sa.column('location', sa.Text()),
+)
+
+
+def _path(location):
+    name = location.split(':', 1)[1]
+    return os.path.join(os.environ['PTERO_WORKFLOW_BLOB_STORAGE_DIRECTORY'],
+            name[:2], name)
+
+
+def upgrade():
+    op.add_column('result_blob', sa.Column('location', sa.Text(), nullable=True))
+    op.add_column('result_blob', sa.Column('size', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    # Blobs kept in blob storage go back into the database.
+    connection = op.get_bind()
+    blobs = connection.execute(sa.select([result_blob.c.hash,
+        result_blob.c.location]).where(
+            result_blob.c.location.isnot(None))).fetchall()
+    for blob_hash, location in blobs:
+        with gzip.open(_path(location), 'rb') as f:
+            data = f.read()
+        connection.execute(sa.text("""
+            UPDATE result_blob SET data = CAST(:data AS jsonb)
+            WHERE hash = :hash
+        """), hash=blob_hash, data=data)
+
+    op.drop_column('result_blob', 'size')
+    op.drop_column('result_blob', 'location')
+
+    # the files are only removed once nothing else in this migration can fail
+    for _, location in blobs:
+        os.remove(_path(location))
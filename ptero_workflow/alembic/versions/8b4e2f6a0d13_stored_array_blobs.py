@@ -0,0 +1,67 @@
+"""stored_array_blobs
+
+Revision ID: 8b4e2f6a0d13
+Revises: 5e1d7b3a9c60
+Create Date: 2026-10-19 16:02:44.318205
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8b4e2f6a0d13'
+down_revision = '5e1d7b3a9c60'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import os
+import sqlalchemy as sa
+import struct
+
+
+result_blob = sa.table('result_blob',
+    sa.column('hash', sa.Text()),
+    sa.column('has_elements', sa.Boolean()),
+    sa.column('location', sa.Text()),
+    sa.column('element_offsets', sa.LargeBinary()),
+)
+
+
+def _path(location):
+    name = location.split(':', 1)[1]
+    return os.path.join(os.environ['PTERO_WORKFLOW_BLOB_STORAGE_DIRECTORY'],
+            name[:2], name)
+
+
+def upgrade():
+    op.add_column('result_blob', sa.Column('element_offsets', sa.LargeBinary(), nullable=True))
+    # single offsets are read with substring, which only avoids reading the
+    # whole value when it is stored uncompressed
+    op.execute('ALTER TABLE result_blob '
+            'ALTER COLUMN element_offsets SET STORAGE EXTERNAL')
+
+
+def downgrade():
+    # Arrays kept in blob storage go back to one element per row.
+    connection = op.get_bind()
+    blobs = connection.execute(sa.select([result_blob.c.hash,
+        result_blob.c.location, result_blob.c.element_offsets]).where(
+            sa.and_(result_blob.c.has_elements,
+                result_blob.c.location.isnot(None)))).fetchall()
+    for blob_hash, location, element_offsets in blobs:
+        offsets = struct.unpack('<%dq' % (len(element_offsets) / 8),
+                element_offsets)
+        with open(_path(location), 'rb') as f:
+            content = f.read()
+        connection.execute(sa.text("""
+            INSERT INTO result_element (blob_hash, index, data)
+            VALUES (:hash, :index, CAST(:data AS jsonb))
+        """), [{'hash': blob_hash, 'index': i, 'data': content[begin:end]}
+            for i, (begin, end) in enumerate(zip(offsets, offsets[1:]))])
+        connection.execute(result_blob.update().where(
+            result_blob.c.hash == blob_hash).values(location=None))
+
+    op.drop_column('result_blob', 'element_offsets')
+
+    # the files are only removed once nothing else in this migration can fail
+    for _, location, _ in blobs:
+        os.remove(_path(location))
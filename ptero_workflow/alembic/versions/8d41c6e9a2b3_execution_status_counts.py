@@ -0,0 +1,47 @@
+"""execution_status_counts
+
+Revision ID: 8d41c6e9a2b3
+Revises: f3a6d80b1c5e
+Create Date: 2026-10-19 16:02:19.531047
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d41c6e9a2b3'
+down_revision = 'f3a6d80b1c5e'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('execution_status_count',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('workflow_id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=True),
+        sa.Column('method_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.Text(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['method_id'], ['method.id'], name=op.f('fk_execution_status_count_method_id_method'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['task_id'], ['task.id'], name=op.f('fk_execution_status_count_task_id_task'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['workflow_id'], ['workflow.id'], name=op.f('fk_execution_status_count_workflow_id_workflow'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_execution_status_count')),
+        sa.UniqueConstraint('method_id', 'status', name=op.f('uq_execution_status_count_method_id')),
+        sa.UniqueConstraint('task_id', 'status', name=op.f('uq_execution_status_count_task_id'))
+    )
+    op.create_index(op.f('ix_execution_status_count_workflow_id'), 'execution_status_count', ['workflow_id'], unique=False)
+
+    op.execute("""
+        INSERT INTO execution_status_count
+            (workflow_id, task_id, method_id, status, count)
+        SELECT workflow_id, task_id, method_id, status, count(id)
+        FROM execution
+        GROUP BY workflow_id, task_id, method_id, status
+    """)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_execution_status_count_workflow_id'), table_name='execution_status_count')
+    op.drop_table('execution_status_count')
@@ -0,0 +1,56 @@
+"""execution_change_seq
+
+Revision ID: 9e2a5c7f3b61
+Revises: 2c7e90b5d1f4
+Create Date: 2026-10-19 17:21:40.613958
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9e2a5c7f3b61'
+down_revision = '2c7e90b5d1f4'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('workflow', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.alter_column('workflow', 'change_seq', server_default=None)
+    op.add_column('execution', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    # Number each workflow's existing executions in the order of their
+    # latest status change.
+    op.execute("""
+        UPDATE execution SET change_seq = numbered.change_seq
+        FROM (
+            SELECT execution.id, row_number() OVER (
+                PARTITION BY execution.workflow_id
+                ORDER BY max(execution_status_history.timestamp),
+                    execution.id) AS change_seq
+            FROM execution
+            LEFT JOIN execution_status_history
+                ON execution_status_history.execution_id = execution.id
+            GROUP BY execution.id, execution.workflow_id
+        ) AS numbered
+        WHERE execution.id = numbered.id
+    """)
+    op.execute("""
+        UPDATE workflow SET change_seq = latest.change_seq
+        FROM (
+            SELECT workflow_id, max(change_seq) AS change_seq
+            FROM execution GROUP BY workflow_id
+        ) AS latest
+        WHERE workflow.id = latest.workflow_id
+    """)
+
+    op.alter_column('execution', 'change_seq', nullable=False)
+    op.create_index('ix_execution_workflow_id_change_seq', 'execution', ['workflow_id', 'change_seq'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_execution_workflow_id_change_seq', table_name='execution')
+    op.drop_column('execution', 'change_seq')
+    op.drop_column('workflow', 'change_seq')
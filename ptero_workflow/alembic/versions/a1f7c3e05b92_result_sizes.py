@@ -0,0 +1,27 @@
+"""result_sizes
+
+Revision ID: a1f7c3e05b92
+Revises: 4e8b2c61d9a3
+Create Date: 2026-10-19 12:31:08.224176
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a1f7c3e05b92'
+down_revision = '4e8b2c61d9a3'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column('result', sa.Column('size', sa.Integer(), nullable=True))
+    op.add_column('result', sa.Column('element_sizes', postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('result', 'element_sizes')
+    op.drop_column('result', 'size')
@@ -0,0 +1,39 @@
+"""jsonb_results_and_executions
+
+Revision ID: b3e9d1742f0c
+Revises: 6a0c3f5e1b27
+Create Date: 2026-10-19 10:02:17.530961
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b3e9d1742f0c'
+down_revision = '6a0c3f5e1b27'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+COLUMNS = [
+    ('result', 'data'),
+    ('execution', 'data'),
+    ('execution', 'colors'),
+    ('execution', 'begins'),
+    ('input_source', 'parallel_depths'),
+]
+
+
+def upgrade():
+    for table, column in COLUMNS:
+        op.execute('ALTER TABLE %(table)s ALTER COLUMN %(column)s '
+                'TYPE jsonb USING %(column)s::jsonb'
+                % {'table': table, 'column': column})
+
+
+def downgrade():
+    for table, column in COLUMNS:
+        op.execute('ALTER TABLE %(table)s ALTER COLUMN %(column)s '
+                'TYPE json USING %(column)s::json'
+                % {'table': table, 'column': column})
@@ -0,0 +1,143 @@
+"""compress_result_elements
+
+Revision ID: c2f7a9e4d581
+Revises: 8b4e2f6a0d13
+Create Date: 2026-10-19 16:41:07.552931
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c2f7a9e4d581'
+down_revision = '8b4e2f6a0d13'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import json
+import os
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import struct
+import uuid
+import zlib
+
+
+result_blob = sa.table('result_blob',
+    sa.column('hash', sa.Text()),
+    sa.column('has_elements', sa.Boolean()),
+    sa.column('location', sa.Text()),
+    sa.column('element_offsets', sa.LargeBinary()),
+)
+
+
+def _elements(from_type, to_type):
+    return sa.table('result_element',
+        sa.column('blob_hash', sa.Text()),
+        sa.column('index', sa.Integer()),
+        sa.column('data', from_type),
+        sa.column('new_data', to_type),
+    )
+
+
+# the encoding of CompressedJSON when this migration was written
+def _encode(canonical_json):
+    if len(canonical_json) >= 1024:
+        return b'z' + zlib.compress(canonical_json, 6)
+    else:
+        return b'j' + canonical_json
+
+
+def _decode(value):
+    value = bytes(value)
+    if value[:1] == b'z':
+        return zlib.decompress(value[1:])
+    else:
+        return value[1:]
+
+
+def _canonical_json(data):
+    return json.dumps(data, sort_keys=True, separators=(',', ':'))
+
+
+def _path(location):
+    name = location.split(':', 1)[1]
+    return os.path.join(os.environ['PTERO_WORKFLOW_BLOB_STORAGE_DIRECTORY'],
+            name[:2], name)
+
+
+def _convert_rows(from_type, to_type, small_rows_sql, convert):
+    op.add_column('result_element', sa.Column('new_data', to_type, nullable=True))
+    op.execute(small_rows_sql)
+
+    connection = op.get_bind()
+    elements = _elements(from_type, to_type)
+    rows = connection.execution_options(stream_results=True).execute(
+            sa.select([elements.c.blob_hash, elements.c.index,
+                elements.c.data]).where(sa.and_(
+                    elements.c.new_data.is_(None),
+                    elements.c.data.isnot(None))))
+    for blob_hash, index, data in rows:
+        connection.execute(elements.update().where(sa.and_(
+            elements.c.blob_hash == blob_hash, elements.c.index == index)
+            ).values(new_data=convert(data)))
+
+    op.drop_column('result_element', 'data')
+    op.alter_column('result_element', 'new_data', new_column_name='data')
+
+
+def _convert_files(convert_part):
+    """
+    Rewrite the arrays kept in blob storage with each element converted by
+    <convert_part> and return the locations of the old files.
+    """
+    connection = op.get_bind()
+    blobs = connection.execute(sa.select([result_blob.c.hash,
+        result_blob.c.location, result_blob.c.element_offsets]).where(
+            sa.and_(result_blob.c.has_elements,
+                result_blob.c.location.isnot(None)))).fetchall()
+    for blob_hash, location, element_offsets in blobs:
+        offsets = struct.unpack('<%dq' % (len(element_offsets) / 8),
+                element_offsets)
+        with open(_path(location), 'rb') as f:
+            content = f.read()
+
+        new_location = 'file:%s-%s.elements' % (blob_hash, uuid.uuid4().hex)
+        new_offsets = [0]
+        with open(_path(new_location), 'wb') as f:
+            for begin, end in zip(offsets, offsets[1:]):
+                part = convert_part(content[begin:end])
+                f.write(part)
+                new_offsets.append(new_offsets[-1] + len(part))
+
+        connection.execute(result_blob.update().where(
+            result_blob.c.hash == blob_hash).values(location=new_location,
+                element_offsets=struct.pack('<%dq' % len(new_offsets),
+                    *new_offsets)))
+
+    return [location for _, location, _ in blobs]
+
+
+def upgrade():
+    _convert_rows(postgresql.JSONB(), sa.LargeBinary(), """
+        UPDATE result_element
+        SET new_data = 'j'::bytea || convert_to(data::text, 'UTF8')
+        WHERE octet_length(data::text) < 1024
+    """, lambda data: _encode(_canonical_json(data)))
+    old_locations = _convert_files(_encode)
+
+    # the files are only removed once nothing else in this migration can fail
+    for location in old_locations:
+        os.remove(_path(location))
+
+
+def downgrade():
+    _convert_rows(sa.LargeBinary(), postgresql.JSONB(), """
+        UPDATE result_element
+        SET new_data = CAST(
+            convert_from(substring(data FROM 2), 'UTF8') AS jsonb)
+        WHERE substring(data FROM 1 FOR 1) = 'j'::bytea
+    """, lambda data: json.loads(_decode(data)))
+    old_locations = _convert_files(_decode)
+
+    for location in old_locations:
+        os.remove(_path(location))
@@ -0,0 +1,123 @@
+"""result_blobs
+
+Revision ID: d25e8f1a7c40
+Revises: a1f7c3e05b92
+Create Date: 2026-10-19 13:05:42.718830
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd25e8f1a7c40'
+down_revision = 'a1f7c3e05b92'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import hashlib
+import json
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+result = sa.table('result',
+    sa.column('id', sa.Integer()),
+    sa.column('data', postgresql.JSONB()),
+    sa.column('has_elements', sa.Boolean()),
+    sa.column('blob_hash', sa.Text()),
+)
+
+result_element = sa.table('result_element',
+    sa.column('result_id', sa.Integer()),
+    sa.column('blob_hash', sa.Text()),
+)
+
+
+def _hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True,
+        separators=(',', ':'))).hexdigest()
+
+
+def upgrade():
+    op.create_table('result_blob',
+        sa.Column('hash', sa.Text(), nullable=False),
+        sa.Column('data', postgresql.JSONB(), nullable=True),
+        sa.Column('has_elements', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.PrimaryKeyConstraint('hash', name=op.f('pk_result_blob'))
+    )
+    op.add_column('result', sa.Column('blob_hash', sa.Text(), nullable=True))
+    op.create_index(op.f('ix_result_blob_hash'), 'result', ['blob_hash'], unique=False)
+    op.create_foreign_key(op.f('fk_result_blob_hash_result_blob'), 'result', 'result_blob', ['blob_hash'], ['hash'])
+    op.add_column('result_element', sa.Column('blob_hash', sa.Text(), nullable=True))
+
+    # Arrays already stored one element per row become blobs.  The element
+    # rows of the first result with each hash are kept for its blob; those of
+    # the other results, and the arrays' inline copies, are dropped.
+    connection = op.get_bind()
+    result_ids = [i for (i,) in connection.execute(sa.select([result.c.id]
+        ).where(result.c.has_elements))]
+    for result_id in result_ids:
+        data = connection.execute(sa.select([result.c.data]).where(
+            result.c.id == result_id)).scalar()
+        blob_hash = _hash(data)
+
+        inserted = connection.execute(sa.text("""
+            INSERT INTO result_blob (hash, has_elements)
+            VALUES (:hash, true)
+            ON CONFLICT (hash) DO NOTHING
+            RETURNING hash
+        """), hash=blob_hash).first()
+        elements = result_element.c.result_id == result_id
+        if inserted is not None:
+            connection.execute(result_element.update().where(elements
+                ).values(blob_hash=blob_hash))
+        else:
+            connection.execute(result_element.delete().where(elements))
+
+        connection.execute(result.update().where(result.c.id == result_id
+            ).values(data=sa.null(), blob_hash=blob_hash))
+
+    op.drop_constraint(op.f('fk_result_element_result_id_result'), 'result_element', type_='foreignkey')
+    op.drop_constraint(op.f('pk_result_element'), 'result_element', type_='primary')
+    op.drop_column('result_element', 'result_id')
+    op.alter_column('result_element', 'blob_hash', existing_type=sa.Text(), nullable=False)
+    op.create_primary_key(op.f('pk_result_element'), 'result_element', ['blob_hash', 'index'])
+    op.create_foreign_key(op.f('fk_result_element_blob_hash_result_blob'), 'result_element', 'result_blob', ['blob_hash'], ['hash'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_constraint(op.f('fk_result_element_blob_hash_result_blob'), 'result_element', type_='foreignkey')
+    op.drop_constraint(op.f('pk_result_element'), 'result_element', type_='primary')
+    op.add_column('result_element', sa.Column('result_id', sa.Integer(), nullable=True))
+
+    # Give every result its own copy of its blob's data again.
+    op.execute("""
+        INSERT INTO result_element (result_id, blob_hash, index, data)
+        SELECT result.id, result_element.blob_hash, result_element.index,
+            result_element.data
+        FROM result JOIN result_element
+            ON result_element.blob_hash = result.blob_hash
+        WHERE result.has_elements
+    """)
+    op.execute("DELETE FROM result_element WHERE result_id IS NULL")
+    op.execute("""
+        UPDATE result SET data = (
+            SELECT jsonb_agg(result_element.data ORDER BY result_element.index)
+            FROM result_element WHERE result_element.result_id = result.id)
+        WHERE result.has_elements
+    """)
+    op.execute("""
+        UPDATE result SET data = result_blob.data
+        FROM result_blob
+        WHERE result.blob_hash = result_blob.hash
+            AND NOT result_blob.has_elements
+    """)
+
+    op.drop_column('result_element', 'blob_hash')
+    op.alter_column('result_element', 'result_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key(op.f('pk_result_element'), 'result_element', ['result_id', 'index'])
+    op.create_foreign_key(op.f('fk_result_element_result_id_result'), 'result_element', 'result', ['result_id'], ['id'], ondelete='CASCADE')
+
+    op.drop_constraint(op.f('fk_result_blob_hash_result_blob'), 'result', type_='foreignkey')
+    op.drop_index(op.f('ix_result_blob_hash'), table_name='result')
+    op.drop_column('result', 'blob_hash')
+    op.drop_table('result_blob')
@@ -0,0 +1,49 @@
+"""transaction_change_seqs
+
+Revision ID: e7c1b4f92a36
+Revises: c2f7a9e4d581
+Create Date: 2026-10-19 17:55:12.904461
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e7c1b4f92a36'
+down_revision = 'c2f7a9e4d581'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # Changes are now numbered with transaction ids.  Existing numbers were
+    # counted per workflow; in the unlikely case that any is not below the
+    # current transaction id, they are all shifted down, keeping their
+    # order, so that new changes are numbered after them.
+    connection = op.get_bind()
+    offset = connection.execute(sa.text("""
+        SELECT greatest(
+            (SELECT max(change_seq) FROM execution),
+            (SELECT max(change_seq) FROM execution_status_history)
+        ) - txid_current() + 1
+    """)).scalar()
+    if offset is not None and offset > 0:
+        for table in ['execution', 'execution_status_history']:
+            connection.execute(sa.text(
+                'UPDATE %s SET change_seq = change_seq - :offset '
+                'WHERE change_seq IS NOT NULL' % table), offset=offset)
+
+
+def downgrade():
+    # The per-workflow counters continue from the largest number given to
+    # each workflow's executions.
+    op.execute("""
+        UPDATE workflow SET change_seq = latest.change_seq
+        FROM (
+            SELECT workflow_id, max(change_seq) AS change_seq
+            FROM execution GROUP BY workflow_id
+        ) AS latest
+        WHERE workflow.id = latest.workflow_id
+            AND workflow.change_seq < latest.change_seq
+    """)
@@ -0,0 +1,56 @@
+"""packed_results
+
+Revision ID: f3a6d80b1c5e
+Revises: 5b0d4e9c2f17
+Create Date: 2026-10-19 15:10:37.482916
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6d80b1c5e'
+down_revision = '5b0d4e9c2f17'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import struct
+
+
+result = sa.table('result',
+    sa.column('id', sa.Integer()),
+    sa.column('data', postgresql.JSONB()),
+    sa.column('packed_type', sa.Text()),
+    sa.column('packed_data', sa.LargeBinary()),
+)
+
+
+# the packing of packed_array when this migration was written: little-endian
+# 64-bit integers ('q') or floats ('d')
+def _unpack(buf, packed_type):
+    buf = bytes(buf)
+    return list(struct.unpack('<%d%s' % (len(buf) / 8, packed_type), buf))
+
+
+def upgrade():
+    op.add_column('result', sa.Column('packed_type', sa.Text(), nullable=True))
+    op.add_column('result', sa.Column('packed_data', sa.LargeBinary(), nullable=True))
+    # single elements are read with substring, which only avoids reading the
+    # whole value when it is stored uncompressed
+    op.execute('ALTER TABLE result ALTER COLUMN packed_data SET STORAGE EXTERNAL')
+
+
+def downgrade():
+    # Packed arrays go back to being inline data.
+    connection = op.get_bind()
+    rows = connection.execution_options(stream_results=True).execute(
+            sa.select([result.c.id, result.c.packed_type,
+                result.c.packed_data]).where(
+                    result.c.packed_type.isnot(None)))
+    for result_id, packed_type, packed_data in rows:
+        connection.execute(result.update().where(result.c.id == result_id
+            ).values(data=_unpack(packed_data, packed_type)))
+
+    op.drop_column('result', 'packed_data')
+    op.drop_column('result', 'packed_type')
@@ -1,3 +1,4 @@
+from . import compression
 from . import v1
 from ..implementation.factory import Factory
 from flask import request, jsonify
@@ -20,6 +21,7 @@ def create_app():
     app.config['RESTFUL_JSON'] = {'indent': 4, 'sort_keys': True}
 
     _attach_factory_to_app(factory, app)
+    app.after_request(compression.compress_response)
 
     return app
 
@@ -0,0 +1,90 @@
+from flask import request
+import itertools
+import os
+import zlib
+
+
+__all__ = ['accepted_encoding', 'compress_response']
+
+
+# JSON responses at least this long are compressed for clients that accept
+# gzip or deflate.  Streamed responses are compressed as they are sent.
+MIN_BYTES = int(os.environ.get('PTERO_WORKFLOW_COMPRESSION_MIN_BYTES', 1024))
+LEVEL = int(os.environ.get('PTERO_WORKFLOW_COMPRESSION_LEVEL', 6))
+
+_WBITS = {
+    'gzip': zlib.MAX_WBITS | 16,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+def accepted_encoding():
+    """
+    Return the content coding ('gzip' or 'deflate') the client prefers, or
+    None if it accepts neither.
+    """
+    return request.accept_encodings.best_match(['gzip', 'deflate'])
+
+
+def compress_response(response):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype != 'application/json':
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        _compress_stream(response, encoding)
+    else:
+        data = response.get_data()
+        if len(data) >= MIN_BYTES:
+            response.set_data(_compress(data, encoding))
+            response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _compress(data, encoding):
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(response, encoding):
+    original = response.response
+    chunks = iter(original)
+
+    # Short streams are sent as they are.
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= MIN_BYTES:
+            break
+    else:
+        if hasattr(original, 'close'):
+            original.close()
+        response.set_data(''.join(head))
+        return
+
+    response.response = _compressed_chunks(itertools.chain(head, chunks),
+            original, encoding)
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+
+
+def _compressed_chunks(chunks, original, encoding):
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, _WBITS[encoding])
+    try:
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        # closing the original stream ends its request context
+        if hasattr(original, 'close'):
+            original.close()
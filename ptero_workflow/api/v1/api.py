@@ -1,4 +1,5 @@
 from flask.ext.restful import Api
+from . import representations
 from . import views
 from ptero_workflow.urls import ENDPOINT_INFO
 
@@ -6,10 +7,12 @@ from ptero_workflow.urls import ENDPOINT_INFO
 __all__ = ['api']
 
 api = Api(default_mediatype='application/json')
+api.representation('application/json')(representations.output_json)
 
 RESOURCES = {
         'workflow-list': views.WorkflowListView,
         'workflow-detail': views.WorkflowDetailView,
+        'workflow-status-events': views.WorkflowStatusEventsView,
         'execution-detail': views.ExecutionDetailView,
         'task-callback': views.TaskCallback,
         'method-callback': views.MethodCallback,
@@ -1,5 +1,6 @@
 from . import limited_workflow_executions
 from . import limited_workflow_status_updates
+from . import spawned_workflow_tree
 from . import spawned_workflows
 from . import workflow_details
 from . import workflow_executions
@@ -13,6 +14,7 @@ from ptero_common.exceptions import NoSuchEntityError
 _REPORTS = {
     'limited-workflow-executions': limited_workflow_executions.report,
     'limited-workflow-status-updates': limited_workflow_status_updates.report,
+    'spawned-workflow-tree': spawned_workflow_tree.report,
     'spawned-workflows': spawned_workflows.report,
     'workflow-details': workflow_details.report,
     'workflow-executions': workflow_executions.report,
@@ -24,10 +26,33 @@ _REPORTS = {
     }
 
 
+# These reports only depend on their workflow's executions and results, so
+# they are unchanged as long as the workflow's version is.  The
+# workflow-executions report also leaves out changes that have not settled
+# (see models.change_seq), which can become visible without the version
+# changing, so it is not versioned.
+_VERSIONED_REPORTS = set(_REPORTS.keys()) - set(['spawned-workflow-tree',
+    'spawned-workflows', 'workflow-executions'])
+
+
+# These reports cannot change once their workflow has finished, so they are
+# rendered once and cached (see Backend.cache_report).
+_CACHED_REPORTS = set(['workflow-details', 'workflow-outputs',
+    'workflow-skeleton', 'workflow-summary'])
+
+
 def report_names():
     return _REPORTS.keys()
 
 
+def is_versioned(report_type):
+    return report_type in _VERSIONED_REPORTS
+
+
+def is_cached(report_type):
+    return report_type in _CACHED_REPORTS
+
+
 def get_report_generator(report_type):
     try:
         return _REPORTS[report_type]
@@ -6,26 +6,38 @@ from ptero_workflow.urls import url_for
 
 LOG = nicer_logging.getLogger(__name__)
 LIMIT = os.environ.get("PTERO_WORKFLOW_DEFAULT_STATUS_UPDATES_LIMIT", 500)
+COUNT_VALUES = ['1', 'true']
 
 
-def report(workflow_id, since=None, limit=LIMIT):
-    updates, timestamp, num_remaining = g.backend.get_limited_workflow_status_updates(
-            workflow_id=workflow_id, since=since, limit=int(limit))
+def report(workflow_id, since=None, since_id=None, limit=LIMIT,
+        count_remaining=None):
+    updates, cursor, has_more, num_remaining = g.backend.get_limited_workflow_status_updates(
+            workflow_id=workflow_id, since=since, since_id=since_id,
+            limit=int(limit), count_remaining=count_remaining in COUNT_VALUES)
 
     base_url = url_for('report', report_type='limited-workflow-status-updates')
 
     url_query_string_args = {'workflow_id': workflow_id, 'limit':limit}
 
-    if timestamp is not None:
+    if cursor is not None:
         format_str = '%Y-%m-%d %H:%M:%S.%f'
+        timestamp, last_id = cursor
         url_query_string_args['since'] = timestamp.strftime(format_str)
+        url_query_string_args['since_id'] = last_id
     else:
         url_query_string_args['since'] = since
+        if since_id is not None:
+            url_query_string_args['since_id'] = since_id
+    if count_remaining in COUNT_VALUES:
+        url_query_string_args['count_remaining'] = count_remaining
 
     url = '%s?%s' % (base_url, urllib.urlencode(url_query_string_args))
 
-    return {
+    result = {
             'updateUrl': url,
             'statusUpdates': updates,
-            'numRemaining': num_remaining,
+            'hasMore': has_more,
     }
+    if num_remaining is not None:
+        result['numRemaining'] = num_remaining
+    return result
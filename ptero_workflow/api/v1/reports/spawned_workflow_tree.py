@@ -0,0 +1,11 @@
+from flask import g
+
+
+def report(workflow_id, max_depth=None):
+    if max_depth is not None:
+        max_depth = int(max_depth)
+    tree = g.backend.get_spawned_workflow_tree(workflow_id,
+            max_depth=max_depth)
+    return {
+           "spawnedWorkflowTree": tree
+    }
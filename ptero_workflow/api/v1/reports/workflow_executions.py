@@ -1,3 +1,4 @@
+from ..representations import JSONStream
 from flask import g
 from ptero_workflow.urls import url_for
 import urllib
@@ -6,17 +7,18 @@ from ptero_common import nicer_logging
 LOG = nicer_logging.getLogger(__name__)
 
 
-def report(workflow_id, since=None):
-    executions, timestamp = g.backend.get_workflow_executions(
-            workflow_id=workflow_id, since=since)
+def report(workflow_id, since=None, since_seq=None):
+    executions, change_seq = g.backend.get_workflow_executions(
+            workflow_id=workflow_id, since=since, since_seq=since_seq)
 
     base_url = url_for('report', report_type='workflow-executions')
 
     url_query_string_args = {'workflow_id': workflow_id}
 
-    if timestamp is not None:
-        format_str = '%Y-%m-%d %H:%M:%S.%f'
-        url_query_string_args['since'] = timestamp.strftime(format_str)
+    if change_seq is not None:
+        url_query_string_args['since_seq'] = change_seq
+    elif since_seq is not None:
+        url_query_string_args['since_seq'] = since_seq
     else:
         url_query_string_args['since'] = since
 
@@ -24,5 +26,5 @@ def report(workflow_id, since=None):
 
     return {
             'updateUrl': url,
-            'executions': executions,
+            'executions': JSONStream(executions),
     }
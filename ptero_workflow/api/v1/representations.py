@@ -0,0 +1,169 @@
+from .. import compression
+from flask import Response, make_response, stream_with_context
+from flask.ext.restful.representations.json import output_json as \
+        _output_json
+import json
+import zlib
+
+
+__all__ = ['JSONStream', 'StreamedJSON', 'RenderedJSON', 'render_json',
+        'iter_json', 'output_json']
+
+
+class JSONStream(object):
+    """
+    A JSON array whose elements are taken from <iterable> while the response
+    is sent, so they never have to be held in memory together.
+    """
+    def __init__(self, iterable):
+        self.iterable = iterable
+
+
+class StreamedJSON(object):
+    """
+    A response body that is encoded by iter_json while it is sent.  Unless
+    <pretty>, it is compact and its keys are unsorted.
+    """
+    def __init__(self, data, pretty=False):
+        self.data = data
+        self.pretty = pretty
+
+
+class RenderedJSON(object):
+    """
+    A response body that was already rendered by render_json, so it can be
+    sent as it is.  If <gzipped>, the body is gzip compressed, and it is
+    only decompressed for clients that do not accept gzip.
+    """
+    def __init__(self, body, gzipped=False):
+        self.body = body
+        self.gzipped = gzipped
+
+    def body_for(self, encoding):
+        if self.gzipped and encoding != 'gzip':
+            return zlib.decompress(self.body, zlib.MAX_WBITS | 16), None
+        elif self.gzipped:
+            return self.body, 'gzip'
+        else:
+            return self.body, None
+
+
+_INDENT = 4
+
+BUFFER_BYTES = 64 * 1024
+
+
+def iter_json(data, pretty=False):
+    """
+    Encode <data> as JSON chunks, iterating over any JSONStream in it only
+    as the chunks are consumed.
+    """
+    if pretty:
+        return _JSONChunks(item_separator=',', key_separator=': ',
+                newline='\n', sort_keys=True).encode(data, 0)
+    else:
+        return _JSONChunks(item_separator=',', key_separator=':',
+                newline='', sort_keys=False).encode(data, 0)
+
+
+def render_json(data, pretty=False):
+    return ''.join(iter_json(data, pretty)) + '\n'
+
+
+class _JSONChunks(object):
+    def __init__(self, item_separator, key_separator, newline, sort_keys):
+        self.key_separator = key_separator
+        self.item_separator = item_separator
+        self.newline = newline
+        self.sort_keys = sort_keys
+
+        self._encoder = json.JSONEncoder(
+                separators=(item_separator, key_separator),
+                indent=_INDENT if newline else None, sort_keys=sort_keys)
+
+    def encode(self, value, level):
+        if isinstance(value, JSONStream):
+            return self._encode_items(value.iterable, '[', ']', level,
+                    self.encode)
+        elif isinstance(value, dict) and _contains_stream(value):
+            items = sorted(value.items()) if self.sort_keys \
+                    else value.iteritems()
+            return self._encode_items(items, '{', '}', level,
+                    self._encode_member)
+        else:
+            return [self._dumps(value, level)]
+
+    def _encode_items(self, items, begin, end, level, encode_item):
+        yield begin
+        empty = True
+        for item in items:
+            yield (self.item_separator if not empty else '') \
+                    + self._indent(level + 1)
+            for chunk in encode_item(item, level + 1):
+                yield chunk
+            empty = False
+        if not empty:
+            yield self._indent(level)
+        yield end
+
+    def _encode_member(self, item, level):
+        key, value = item
+        yield self._encoder.encode(key) + self.key_separator
+        for chunk in self.encode(value, level):
+            yield chunk
+
+    def _dumps(self, value, level):
+        encoded = self._encoder.encode(value)
+        if self.newline and level:
+            # JSON strings never contain raw newlines
+            return encoded.replace('\n', '\n' + ' ' * (_INDENT * level))
+        else:
+            return encoded
+
+    def _indent(self, level):
+        if self.newline:
+            return self.newline + ' ' * (_INDENT * level)
+        else:
+            return ''
+
+
+def _contains_stream(value):
+    if isinstance(value, JSONStream):
+        return True
+    elif isinstance(value, dict):
+        return any(_contains_stream(v) for v in value.itervalues())
+    else:
+        return False
+
+
+def output_json(data, code, headers=None):
+    if isinstance(data, StreamedJSON):
+        response = Response(stream_with_context(
+            _buffered(iter_json(data.data, data.pretty))), code)
+        response.headers.extend(headers or {})
+        return response
+    elif isinstance(data, RenderedJSON):
+        body, encoding = data.body_for(compression.accepted_encoding())
+        response = make_response(body, code)
+        response.headers.extend(headers or {})
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+        return response
+    else:
+        return _output_json(data, code, headers)
+
+
+def _buffered(chunks):
+    # Chunks are joined so that the server writes them in large pieces.
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= BUFFER_BYTES:
+            yield ''.join(buffered)
+            buffered = []
+            size = 0
+    buffered.append('\n')
+    yield ''.join(buffered)
@@ -1,12 +1,16 @@
 from . import reports
+from .representations import RenderedJSON, StreamedJSON, render_json
 from . import validators
 from ...implementation import exceptions
-from flask import g, request
+from ...implementation import status_events
+from flask import Response, g, request
 from ptero_workflow.urls import url_for, url_parse
 from flask.ext.restful import Resource
+from werkzeug.http import quote_etag
 from jsonschema import ValidationError
 from ...implementation.exceptions import ValidationError as PteroValidationError
 from ...implementation.exceptions import InvalidExecutionUrlError
+import json
 import uuid
 
 from ptero_common import nicer_logging
@@ -17,6 +21,9 @@ import urllib
 
 LOG = nicer_logging.getLogger(__name__)
 
+# Reports are compact unless requested with ?pretty=1
+PRETTY_VALUES = ['1', 'true']
+
 
 class WorkflowListView(Resource):
     @logged_response(logger=LOG)
@@ -133,8 +140,13 @@ class WorkflowDetailView(Resource):
     @logged_response(logger=LOG)
     @handles_no_such_entity_error
     def get(self, workflow_id):
+        version = g.backend.get_workflow_version(workflow_id)
+        if _not_modified(version):
+            return _not_modified_response(version)
+
         workflow_as_dict = g.backend.get_workflow(workflow_id)
-        return _prepare_workflow_data(workflow_id, workflow_as_dict), 200
+        return (_prepare_workflow_data(workflow_id, workflow_as_dict), 200,
+                _etag_headers(version))
 
     @logged_response(logger=LOG)
     @handles_no_such_entity_error
@@ -161,12 +173,49 @@ def _patch_workflow(patch_data, workflow_id):
         return _prepare_workflow_data(workflow_id, workflow_as_dict), 200
 
 
+class WorkflowStatusEventsView(Resource):
+    @handles_no_such_entity_error
+    def get(self, workflow_id):
+        # raises NoSuchEntityError for unknown workflows
+        g.backend.get_workflow_version(workflow_id)
+
+        since_seq = request.headers.get('Last-Event-ID',
+                request.args.get('since_seq'))
+        try:
+            since_seq = int(since_seq) if since_seq is not None else None
+        except ValueError:
+            return {'error': 'Invalid event id: %s' % since_seq}, 400
+
+        LOG.info('Streaming status updates of workflow %s after %s',
+                workflow_id, since_seq)
+        subscription = status_events.subscribe(workflow_id, since_seq)
+        return Response(_status_event_stream(subscription),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache'})
+
+
+def _status_event_stream(subscription):
+    try:
+        for change_seq, updates in subscription:
+            if updates is None:
+                yield ':\n\n'
+            else:
+                yield 'id: %s\nevent: status-updates\ndata: %s\n\n' % (
+                        change_seq, json.dumps(updates))
+    finally:
+        subscription.close()
+
+
 class ExecutionDetailView(Resource):
     @logged_response(logger=LOG)
     @handles_no_such_entity_error
     def get(self, execution_id):
+        version = g.backend.get_execution_version(execution_id)
+        if _not_modified(version):
+            return _not_modified_response(version)
+
         execution_data = g.backend.get_execution(execution_id)
-        return execution_data, 200
+        return execution_data, 200, _etag_headers(version)
 
     @logged_response(logger=LOG)
     @handles_no_such_entity_error
@@ -227,7 +276,57 @@ class ReportDetailView(Resource):
     @handles_no_such_entity_error
     def get(self, report_type):
         generator = reports.get_report_generator(report_type)
-        return generator(**request.args.to_dict(flat=True)), 200
+        args = request.args.to_dict(flat=True)
+        pretty = args.pop('pretty', None) in PRETTY_VALUES
+        cached = (reports.is_cached(report_type) and not pretty and
+                args.keys() == ['workflow_id'])
+        if cached and g.backend.is_workflow_finished(args['workflow_id']):
+            return _cached_report(report_type, args['workflow_id'], generator)
+        elif reports.is_versioned(report_type) and 'workflow_id' in args:
+            version = g.backend.get_workflow_version(args['workflow_id'])
+            if pretty:
+                # pretty and compact reports are different representations
+                version += '.pretty'
+            if _not_modified(version):
+                return _not_modified_response(version)
+            return (StreamedJSON(generator(**args), pretty), 200,
+                    _etag_headers(version))
+        else:
+            return StreamedJSON(generator(**args), pretty), 200
+
+
+# Only reports of finished workflows are rendered in memory to be cached;
+# those of running workflows could change before they were ever served again,
+# so they are streamed.
+def _cached_report(report_type, workflow_id, generator):
+    version, gzipped_body = g.backend.get_cached_report(workflow_id,
+            report_type)
+    if _not_modified(version):
+        return _not_modified_response(version)
+
+    if gzipped_body is not None:
+        return RenderedJSON(gzipped_body, gzipped=True), 200, \
+                _etag_headers(version)
+
+    body = render_json(generator(workflow_id=workflow_id))
+    g.backend.cache_report(workflow_id, report_type, version, body)
+    return RenderedJSON(body), 200, _etag_headers(version)
+
+
+# Workflows are versioned (see Backend.get_workflow_version), so a client that
+# already has the representation of the current version is told so before it
+# is built again.  ETags are weak, since responses may be sent compressed or
+# not.
+def _not_modified(version):
+    return request.if_none_match.contains_weak(version)
+
+
+def _not_modified_response(version):
+    return '', 304, _etag_headers(version)
+
+
+def _etag_headers(version):
+    return {'ETag': quote_etag(version, weak=True)}
 
 
 class ServerInfo(Resource):
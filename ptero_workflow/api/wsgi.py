@@ -1,9 +1,17 @@
 from ptero_workflow.api import application
 from ptero_common.logging_configuration import configure_web_logging
+from gevent import monkey
+from psycogreen.gevent import patch_psycopg
 import argparse
 import os
 
 
+# gunicorn's gevent workers monkey patch the standard library before loading
+# the app, but psycopg2 waits for the database in C, which would block every
+# other request of the worker, so it must wait through gevent too.
+if monkey.is_module_patched('socket'):
+    patch_psycopg()
+
 app = application.create_app()
 
 configure_web_logging("WORKFLOW")
@@ -1,15 +1,27 @@
 from . import models
 from .models.execution.execution_base import Execution
+from sqlalchemy import and_, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy.orm import contains_eager
 from ptero_workflow.implementation import exceptions
+from ptero_workflow.implementation import result_cache
 from ptero_workflow.implementation.model_builder import ModelBuilder
+from ptero_workflow.implementation.spawned_workflow_tree import \
+        SpawnedWorkflowTreeReport
+from ptero_workflow.implementation.workflow_details import \
+        WorkflowDetailsReport
+from ptero_workflow.implementation.workflow_executions import \
+        WorkflowExecutionsReport
+from ptero_workflow.implementation.workflow_summary import \
+        WorkflowSummaryReport
+from ptero_workflow.implementation.workflow_tree import WorkflowTree
 from ptero_common import nicer_logging
 from ptero_common.server_info import get_server_info
 from ptero_workflow.urls import petri_url_for
 import re
-from ptero_common.statuses import (scheduled, errored)
+from ptero_common.statuses import (scheduled, errored, succeeded, failed,
+        canceled)
 from ptero_common.exceptions import NoSuchEntityError
 import uuid
 
@@ -18,6 +30,8 @@ LOG = nicer_logging.getLogger(__name__)
 
 _TASK_BASE = 'ptero_workflow.implementation.celery_tasks.'
 
+_FINISHED_STATUSES = set([succeeded, failed, canceled])
+
 
 class Backend(object):
     def __init__(self, session, celery_app, db_revision):
@@ -71,6 +85,7 @@ class Backend(object):
 
     def submit_net(self, workflow_name):
         workflow = self._get_workflow_by_name(workflow_name)
+        WorkflowTree(self.session, workflow)
         petri_data = workflow.build_petri_net()
 
         LOG.info('Submitting petri net <%s> for'
@@ -96,28 +111,7 @@ class Backend(object):
 
     def _get_workflow_eagerly(self, workflow_id):
         workflow = self._get_workflow(workflow_id)
-
-        # Here we load entities and eagerly-load some of their properties.
-        # Later, when those entities are iterated through we won't have to issue
-        # SQL per-entity.
-        m = models
-        method_lists = self.session.query(m.MethodList).\
-                options(
-                        joinedload(m.MethodList.method_list),
-                        joinedload(m.MethodList.webhooks),
-                ).filter_by(workflow_id=workflow_id).all()
-
-        dags = self.session.query(m.DAG).\
-                options(
-                        joinedload(m.DAG.children),
-                        joinedload(m.DAG.webhooks),
-                ).filter_by(workflow_id=workflow_id).all()
-
-        jobs = self.session.query(m.Job).\
-                options(joinedload(m.Job.webhooks)).\
-                filter_by(workflow_id=workflow_id).all()
-
-
+        WorkflowTree(self.session, workflow)
         return workflow
 
     def _get_workflow(self, workflow_id):
@@ -128,6 +122,65 @@ class Backend(object):
             raise NoSuchEntityError(
                     "Workflow with id %s was not found." % workflow_id)
 
+    def get_workflow_version(self, workflow_id):
+        """
+        Return a version tag that changes whenever any of the workflow's
+        executions or results do.
+        """
+        row = self.session.query(models.Workflow.id, models.Workflow.change_seq
+                ).filter(models.Workflow.id == workflow_id).first()
+        if row is not None:
+            return '%s.%s' % row
+        else:
+            raise NoSuchEntityError(
+                    "Workflow with id %s was not found." % workflow_id)
+
+    def get_execution_version(self, execution_id):
+        row = self.session.query(models.Workflow.id, models.Workflow.change_seq
+                ).join(Execution, Execution.workflow_id == models.Workflow.id
+                ).filter(Execution.id == execution_id).first()
+        if row is not None:
+            return '%s.%s' % row
+        else:
+            raise NoSuchEntityError(
+                    "Execution with id %s was not found." % execution_id)
+
+    def get_cached_report(self, workflow_id, report_type):
+        """
+        Return the workflow's version and the gzipped body of the report
+        cached at that version, or None if there is none.
+        """
+        C = models.CachedReport
+        row = self.session.query(models.Workflow.id, models.Workflow.change_seq,
+                C).outerjoin(C, and_(C.workflow_id == models.Workflow.id,
+                    C.report_type == report_type,
+                    C.change_seq == models.Workflow.change_seq)
+                ).filter(models.Workflow.id == workflow_id).first()
+        if row is None:
+            raise NoSuchEntityError(
+                    "Workflow with id %s was not found." % workflow_id)
+
+        workflow_id, change_seq, cached = row
+        version = '%s.%s' % (workflow_id, change_seq)
+        if cached is not None:
+            return version, bytes(cached.gzipped_body)
+        else:
+            return version, None
+
+    def cache_report(self, workflow_id, report_type, version, body):
+        """
+        Cache the <body> of the report rendered at <version> if the workflow
+        has finished, since its reports can no longer change then.
+        """
+        # The version was read before the report was rendered, so a change
+        # made in between leaves the body under an outdated version, which
+        # is never served.
+        if self.is_workflow_finished(workflow_id):
+            change_seq = int(version.split('.')[1])
+            models.cache_report(self.session, workflow_id, report_type,
+                    change_seq, body)
+            self.session.commit()
+
     def get_workflow(self, workflow_id):
         workflow = self._get_workflow(workflow_id)
         return {
@@ -162,101 +215,75 @@ class Backend(object):
     def get_workflow_status(self, workflow_id):
         return self._get_workflow(workflow_id).status
 
-    def get_workflow_details(self, workflow_id):
-        m = models
-        method_lists = self.session.query(m.MethodList).\
-                options(joinedload(m.MethodList.executions)).\
-                filter_by(workflow_id=workflow_id).all()
-
-        dags = self.session.query(m.DAG).\
-                options(joinedload(m.DAG.executions)).\
-                filter_by(workflow_id=workflow_id).all()
-
-        jobs = self.session.query(m.Job).\
-                options(joinedload(m.Job.executions)).\
-                filter_by(workflow_id=workflow_id).all()
-        return self._get_workflow_eagerly(workflow_id).as_dict(detailed=True)
+    def is_workflow_finished(self, workflow_id):
+        return self.get_workflow_status(workflow_id) in _FINISHED_STATUSES
 
-    def get_workflow_skeleton(self, workflow_id):
+    def get_workflow_details(self, workflow_id):
         workflow = self._get_workflow(workflow_id)
+        return WorkflowDetailsReport(self.session, workflow).as_dict()
 
-        # Here we load entities and eagerly-load some of their properties.
-        # Later, when those entities are iterated through we won't have to issue
-        # SQL per-entity.
-        m = models
-        method_lists = self.session.query(m.MethodList).\
-                options(
-                        joinedload(m.MethodList.method_list),
-                ).filter_by(workflow_id=workflow_id).all()
-
-        dags = self.session.query(m.DAG).\
-                options(
-                        joinedload(m.DAG.children),
-                ).filter_by(workflow_id=workflow_id).all()
-
-        return workflow.as_skeleton_dict()
+    def get_workflow_skeleton(self, workflow_id):
+        return self._get_workflow_eagerly(workflow_id).as_skeleton_dict()
 
     def get_workflow_outputs(self, workflow_id):
         return self._get_workflow(workflow_id).get_outputs()
 
-    def get_workflow_executions(self, workflow_id, since=None):
-        query = self.session.query(models.Execution)
-
-        if since is not None:
-            query = query.join(models.ExecutionStatusHistory).\
-                    filter(models.Execution.workflow_id == workflow_id,
-                            models.ExecutionStatusHistory.timestamp > since)
-        else:
-            query = query.filter(models.Execution.workflow_id == workflow_id)
-
-        executions = query.all()
-
-        if executions:
-            timestamp = max([e.update_timestamp for e in executions])
-            return [e.as_dict_for_executions_report() for e in executions], timestamp
-        else:
-            return [], None
+    def get_workflow_executions(self, workflow_id, since=None, since_seq=None):
+        """
+        Return an iterator over the workflow's executions changed after
+        <since_seq>, and the change sequence number they run up to (None if
+        there are none).
+        """
+        report = WorkflowExecutionsReport(self.session, workflow_id,
+                since=since, since_seq=since_seq)
+        return report.executions(), report.change_seq
 
     def get_limited_workflow_executions(self, **kwargs):
         model_class = models.Execution
         return self._get_limited_reports(model_class=model_class, **kwargs)
 
     def _get_limited_reports(self, model_class, workflow_id,
-            limit, since=None):
-
-        query = self._base_reports_query(model_class, workflow_id, since)
+            limit, since=None, since_id=None, count_remaining=False):
+        query = self._base_reports_query(model_class, workflow_id, since,
+                since_id)
 
-        instances = query.order_by(model_class.timestamp).limit(limit + 1).all()
+        instances = query.order_by(model_class.timestamp, model_class.id
+                ).limit(limit + 1).all()
 
         if instances:
-            if len(instances) == limit + 1:
-                # ensure that we return exactly the right number of results
-                next_execution = instances.pop()
-            else:
-                next_execution = instances[-1]
-            timestamp = next_execution.timestamp
+            # ensure that we return exactly the right number of results
+            has_more = len(instances) == limit + 1
+            instances = instances[:limit]
+            cursor = (instances[-1].timestamp, instances[-1].id)
 
             reports = [i.as_dict_for_limited_report() for i in instances]
 
-            total_count = query.count()
-            num_remaining = total_count - len(instances)
+            if count_remaining:
+                num_remaining = self._base_reports_query(model_class,
+                        workflow_id, *cursor).count()
+            else:
+                num_remaining = None
 
-            return reports, timestamp, num_remaining
+            return reports, cursor, has_more, num_remaining
         else:
             # try to fetch the workflow, maybe it doesn't exist, in which case
             # an exception will be raised and response will be handled by the
             # ptero_common.view_wrapper.handles_no_such_entity_error() decorator
-            workflow = self._get_workflow(workflow_id)
-            return [], None, 0
-
-    def _base_reports_query(self, model_class, workflow_id, since):
-        query = self.session.query(model_class)
-
-        if since is not None:
-            query = query.filter(model_class.workflow_id == workflow_id,
-                            model_class.timestamp >= since)
-        else:
-            query = query.filter(model_class.workflow_id == workflow_id)
+            self._get_workflow(workflow_id)
+            return [], None, False, (0 if count_remaining else None)
+
+    def _base_reports_query(self, model_class, workflow_id, since, since_id):
+        query = self.session.query(model_class).filter(
+                model_class.workflow_id == workflow_id)
+
+        # Many rows share a timestamp (it is the transaction time), so pages
+        # are ordered by (timestamp, id) and continue after the last row of
+        # the previous page.  A bare timestamp is accepted for older clients.
+        if since is not None and since_id is not None:
+            query = query.filter(tuple_(model_class.timestamp,
+                model_class.id) > (since, since_id))
+        elif since is not None:
+            query = query.filter(model_class.timestamp >= since)
         return query
 
     def get_limited_workflow_status_updates(self, **kwargs):
@@ -327,6 +354,7 @@ class Backend(object):
     def server_info(self):
         result = get_server_info('ptero_workflow.implementation.celery_app')
         result['databaseRevision'] = self.db_revision
+        result['resultCache'] = result_cache.stats()
         return result
 
     def cleanup(self):
@@ -346,32 +374,46 @@ class Backend(object):
                 workflow.name, workflow.id,
                 extra={'workflowName': workflow.name})
         workflow.issue_job_delete_requests()
+        blob_hashes = self._get_blob_hashes(workflow.id)
         self.session.delete(workflow)
         self.session.commit()
+        result_cache.invalidate_workflow(workflow.id)
+        self._delete_unreferenced_blobs(blob_hashes)
 
-    def get_workflow_summary(self, workflow_id):
+    def _get_blob_hashes(self, workflow_id):
         m = models
-        method_lists = self.session.query(m.MethodList).\
-                options(
-                        joinedload(m.MethodList.method_list),
-                ).filter_by(workflow_id=workflow_id).all()
-
-        dags = self.session.query(m.DAG).\
-                filter_by(workflow_id=workflow_id).all()
-
-        jobs = self.session.query(m.Job).\
-                filter_by(workflow_id=workflow_id).all()
+        return [h for (h,) in self.session.query(m.Result.blob_hash
+                ).join(m.Task, m.Result.task_id == m.Task.id
+                ).filter(m.Task.workflow_id == workflow_id,
+                    m.Result.blob_hash.isnot(None)
+                ).distinct()]
+
+    def _delete_unreferenced_blobs(self, blob_hashes):
+        models.result.delete_unreferenced_blobs(self.session, blob_hashes)
+        self.session.commit()
 
-        return self._get_workflow(workflow_id).as_dict_for_summary()
+    def get_workflow_summary(self, workflow_id):
+        workflow = self._get_workflow(workflow_id)
+        return WorkflowSummaryReport(self.session, workflow).as_dict()
 
     def submit_job(self, execution_id):
         execution = self._get_execution(execution_id)
 
         job_id = str(uuid.uuid4())
         execution.data['jobId'] = job_id
+        try:
+            service_url = execution.method.select_service_url(execution)
+        except exceptions.UnknownServicePoolError as e:
+            LOG.exception('Failed to select a service url for execution '
+                    '"%s" of workflow "%s"', execution.name,
+                    execution.workflow.name,
+                    extra={'workflowName': execution.workflow.name})
+            self._fail_job_submission(execution, e.message)
+            return
+        execution.data['serviceUrl'] = service_url
         self.session.commit()
 
-        job_url = execution.method.get_job_submit_url(job_id)
+        job_url = execution.method.get_job_submit_url(job_id, service_url)
         LOG.info('Submitting Job for execution "%s" of workflow '
                 '"%s" -- %s', execution.name, execution.workflow.name,
                 job_url, extra={'workflowName': execution.workflow.name})
@@ -384,20 +426,24 @@ class Backend(object):
             execution.status = scheduled
             url_from_header = response_info['headers']['location']
             execution.data['jobUrl'] = url_from_header
+            self.session.commit()
         else:
             error_message = 'Failed to submit job to service. ' +\
                     'Execution id: %s'
             LOG.error(error_message, execution.id,
                     extra={'workflowName': execution.workflow.name})
-            execution.status = errored
-            execution.data['error_message'] = error_message
-
-            response_url = execution.data[
-                    'petri_response_links_for_job']['failure']
-            LOG.info('Notifying petri: execution "%s" failed for'
-                    ' workflow "%s"', execution.name, execution.workflow.name,
-                    extra={'workflowName': execution.workflow.name})
-            self.http_task.delay('PUT', response_url)
+            self._fail_job_submission(execution, error_message)
+
+    def _fail_job_submission(self, execution, error_message):
+        execution.status = errored
+        execution.data['error_message'] = error_message
+
+        response_url = execution.data[
+                'petri_response_links_for_job']['failure']
+        LOG.info('Notifying petri: execution "%s" failed for'
+                ' workflow "%s"', execution.name, execution.workflow.name,
+                extra={'workflowName': execution.workflow.name})
+        self.http_task.delay('PUT', response_url)
         self.session.commit()
 
     def get_spawned_workflows(self, workflow_id):
@@ -415,3 +461,8 @@ class Backend(object):
         else:
             workflow = self.get_workflow(workflow_id)
             return []
+
+    def get_spawned_workflow_tree(self, workflow_id, max_depth=None):
+        report = SpawnedWorkflowTreeReport(self.session, workflow_id,
+                max_depth=max_depth)
+        return report.as_dict()
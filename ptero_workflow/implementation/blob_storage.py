@@ -0,0 +1,101 @@
+import errno
+import gzip
+import os
+import tempfile
+
+
+__all__ = ['get_storage', 'LocalFileStorage']
+
+
+class LocalFileStorage(object):
+    """
+    Stores each blob as a file in <directory>, which must be shared by every
+    web and worker process.  Whole blobs are gzipped; blobs stored in parts
+    are not, so that a single part can be read without reading the others.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, location):
+        name = location.split(':', 1)[1]
+        return os.path.join(self.directory, name[:2], name)
+
+    def location(self, name, suffix='.json.gz'):
+        return 'file:%s%s' % (name, suffix)
+
+    def put(self, location, content):
+        """
+        Store <content> (a str) at <location>.
+        """
+        def write(f):
+            with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                gz.write(content)
+        self._write(location, write)
+
+    def put_parts(self, location, parts):
+        """
+        Store the concatenation of <parts> (strs) at <location>, uncompressed,
+        and return the offset of each part followed by the total length.
+        """
+        offsets = [0]
+        for part in parts:
+            offsets.append(offsets[-1] + len(part))
+
+        def write(f):
+            for part in parts:
+                f.write(part)
+        self._write(location, write)
+        return offsets
+
+    def _write(self, location, write):
+        path = self._path(location)
+        _makedirs(os.path.dirname(path))
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.rename(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
+
+    def open(self, location):
+        """
+        Return a file-like object from which the content stored with put at
+        <location> can be streamed.
+        """
+        return gzip.open(self._path(location), 'rb')
+
+    def read(self, location, offset, length):
+        """
+        Return <length> bytes, starting at <offset>, of the content stored
+        with put_parts at <location>.
+        """
+        with open(self._path(location), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def delete(self, location):
+        try:
+            os.remove(self._path(location))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+def _makedirs(directory):
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def get_storage():
+    """
+    Return the configured storage for large results or None if results are
+    only stored in the database.
+    """
+    directory = os.environ.get('PTERO_WORKFLOW_BLOB_STORAGE_DIRECTORY')
+    if directory:
+        return LocalFileStorage(directory)
@@ -0,0 +1,161 @@
+from ptero_common import nicer_logging
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+import json
+import os
+import select as select_module
+import threading
+
+
+LOG = nicer_logging.getLogger(__name__)
+
+__all__ = ['notify', 'notify_many', 'subscribe', 'unsubscribe',
+        'ChangeListener']
+
+
+# Changes to executions, results and workflows are announced on this channel
+# with NOTIFY, which Postgres delivers when (and only if) the announcing
+# transaction commits.  Each process listens with one connection and hands
+# the changes to its in-process consumers.
+CHANNEL = 'ptero_workflow_changes'
+
+RECONNECT_DELAY = float(os.environ.get(
+    'PTERO_WORKFLOW_CHANGE_BUS_RECONNECT_DELAY', 5))
+
+
+def notify(connection, workflow_id, entity, entity_id, change_seq):
+    """
+    Announce, once the current transaction commits, that the <entity>
+    ('execution', 'result' or 'workflow') with id <entity_id> of the workflow
+    changed.  <connection> may be a connection or a session.
+    """
+    notify_many(connection, [(workflow_id, entity, entity_id, change_seq)])
+
+
+_NOTIFY_MANY = text("""
+    SELECT pg_notify(:channel, payload)
+    FROM unnest(CAST(:payloads AS text[])) AS payload
+""")
+
+
+def notify_many(connection, changes):
+    """
+    Announce <changes>, a list of (workflow_id, entity, entity_id,
+    change_seq), as notify would, with one statement.
+    """
+    connection.execute(_NOTIFY_MANY, {'channel': CHANNEL,
+        'payloads': [_payload(*change) for change in changes]})
+
+
+def _payload(workflow_id, entity, entity_id, change_seq):
+    return json.dumps({
+        'workflowId': workflow_id,
+        'entity': entity,
+        'id': entity_id,
+        'seq': change_seq,
+    }, separators=(',', ':'))
+
+
+class ChangeListener(object):
+    """
+    Listens for changes on its own connection to <db_string> and calls each
+    subscribed callback with every change, as a dict of the notified fields.
+    """
+    def __init__(self, db_string, timeout=1):
+        self.db_string = db_string
+        self.timeout = timeout
+
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listening = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait_until_listening(self, timeout=None):
+        return self._listening.wait(timeout)
+
+    def _run(self):
+        engine = create_engine(self.db_string, poolclass=NullPool,
+                isolation_level='AUTOCOMMIT')
+        while not self._stopped.is_set():
+            try:
+                self._listen(engine)
+            except Exception:
+                LOG.exception('Lost the connection listening for changes')
+                self._listening.clear()
+                self._stopped.wait(RECONNECT_DELAY)
+
+    def _listen(self, engine):
+        raw_connection = engine.raw_connection()
+        connection = raw_connection.connection
+        try:
+            connection.cursor().execute('LISTEN %s' % CHANNEL)
+            self._listening.set()
+
+            while not self._stopped.is_set():
+                readable, _, _ = select_module.select([connection], [], [],
+                        self.timeout)
+                if readable:
+                    connection.poll()
+                    while connection.notifies:
+                        self._dispatch(connection.notifies.pop(0).payload)
+        finally:
+            raw_connection.close()
+
+    def _dispatch(self, payload):
+        change = json.loads(payload)
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(change)
+            except Exception:
+                LOG.exception('Change consumer %s failed on %s', callback,
+                        payload)
+
+
+_LISTENER = None
+_LISTENER_PID = None
+_LISTENER_LOCK = threading.Lock()
+
+
+def _get_listener():
+    # Listeners are started lazily, and again in forked children (celery
+    # and gunicorn workers), since threads do not survive a fork.
+    global _LISTENER, _LISTENER_PID
+    with _LISTENER_LOCK:
+        if _LISTENER is None or _LISTENER_PID != os.getpid():
+            _LISTENER = ChangeListener(os.environ['PTERO_WORKFLOW_DB_STRING'])
+            _LISTENER_PID = os.getpid()
+            _LISTENER.start()
+        return _LISTENER
+
+
+def subscribe(callback):
+    """
+    Call <callback> with every change committed by any process, starting this
+    process's listener if needed.
+    """
+    _get_listener().subscribe(callback)
+
+
+def unsubscribe(callback):
+    _get_listener().unsubscribe(callback)
@@ -54,6 +54,14 @@ class InvalidExecutionUrlError(ValidationError):
     pass
 
 
+class UnknownServicePoolError(ValidationError):
+    pass
+
+
+class InvalidServicePoolsError(Exception):
+    pass
+
+
 class DuplicatePetriNetError(Exception):
     pass
 
@@ -173,12 +173,21 @@ class ModelBuilder(object):
                 'workflow': self.workflow
         }
 
-        if 'serviceUrl' in method_data:
-            constructor_args['service_url'] = method_data['serviceUrl']
+        if 'serviceUrl' in method_data or 'servicePool' in method_data:
+            constructor_args.update(self.get_service_url_args(method_data))
             constructor_args['service_data_to_save'] = method_data.get('serviceDataToSave', [])
 
         return cls(**constructor_args)
 
+    def get_service_url_args(self, method_data):
+        if 'servicePool' in method_data:
+            validators.known_service_pool(method_data['servicePool'])
+            return {'service_pool': method_data['servicePool']}
+        elif isinstance(method_data['serviceUrl'], basestring):
+            return {'service_url': method_data['serviceUrl']}
+        else:
+            return {'service_urls': method_data['serviceUrl']}
+
     def build_initial_dag_execution(self, root_method):
         return models.MethodExecution(method=root_method,
                 color=0, parent_color=None, colors=[0],
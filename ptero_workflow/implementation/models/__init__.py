@@ -1,4 +1,6 @@
 from .base import *
+from .cached_report import *
+from .change_seq import *
 from .link import *
 from .execution import *
 from .input_source import *
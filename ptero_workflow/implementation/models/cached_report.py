@@ -0,0 +1,62 @@
+from .base import Base
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, LargeBinary
+from sqlalchemy import Text, UniqueConstraint, bindparam, text
+import zlib
+
+
+__all__ = ['CachedReport', 'cache_report']
+
+
+# Bodies are stored in gzip format, so they can also be sent as they are to
+# clients that accept gzip.
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+class CachedReport(Base):
+    """
+    A report rendered when its workflow's change sequence number was
+    <change_seq>.  Only reports of finished workflows are cached, and they
+    are deleted along with their workflow.
+    """
+    __tablename__ = 'cached_report'
+
+    __table_args__ = (
+        UniqueConstraint('workflow_id', 'report_type'),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    workflow_id = Column(Integer, ForeignKey('workflow.id', ondelete='CASCADE'),
+            nullable=False)
+    report_type = Column(Text, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    gzipped_body = Column(LargeBinary, nullable=False)
+
+
+def gzip(body, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+_UPSERT = text("""
+    INSERT INTO cached_report
+        (workflow_id, report_type, change_seq, gzipped_body)
+    VALUES (:workflow_id, :report_type, :change_seq, :gzipped_body)
+    ON CONFLICT (workflow_id, report_type) DO UPDATE
+    SET change_seq = EXCLUDED.change_seq,
+        gzipped_body = EXCLUDED.gzipped_body
+    WHERE cached_report.change_seq < EXCLUDED.change_seq
+""").bindparams(bindparam('gzipped_body', type_=LargeBinary))
+
+
+def cache_report(session, workflow_id, report_type, change_seq, body):
+    """
+    Store the rendered <body> of the report, unless a report rendered at a
+    later change is already stored.
+    """
+    session.execute(_UPSERT, {
+        'workflow_id': workflow_id,
+        'report_type': report_type,
+        'change_seq': change_seq,
+        'gzipped_body': gzip(body),
+    })
@@ -0,0 +1,80 @@
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+
+
+__all__ = ['settled_change_seq_bound']
+
+
+# Changes to executions and their status updates are numbered with the id of
+# the transaction that made them (txid_current), so numbering a change takes
+# no lock and concurrent transactions changing the same workflow do not wait
+# for each other.  Transaction ids are not given out in commit order, so
+# readers only consider numbers below settled_change_seq_bound(): every
+# transaction with a smaller id has committed or rolled back, so no change
+# with such a number can still appear, and a reader that has seen them all
+# cannot miss one.  A change made while an older transaction is still running
+# is held back until that transaction ends.
+#
+# workflow.change_seq is a version, bumped at commit for every workflow whose
+# executions or results the transaction changed.  The workflow rows are
+# locked in id order, so concurrent commits cannot deadlock, and only for
+# the duration of the commit.
+
+_CHANGE_SEQ = 'ptero_workflow.change_seq'
+_CHANGED_WORKFLOWS = 'ptero_workflow.changed_workflows'
+
+
+def settled_change_seq_bound():
+    """
+    Return an expression for the lowest change sequence number that may
+    still be given to a change that is not yet visible.
+    """
+    return func.txid_snapshot_xmin(func.txid_current_snapshot())
+
+
+def get_change_seq(session, connection):
+    """
+    Return the change sequence number of the current transaction of
+    <session>, which must already be writing through <connection>.
+    """
+    if _CHANGE_SEQ not in session.info:
+        session.info[_CHANGE_SEQ] = connection.execute(
+                select([func.txid_current()])).scalar()
+    return session.info[_CHANGE_SEQ]
+
+
+def workflows_changed(session, workflow_ids):
+    """
+    Bump the versions of the workflows with <workflow_ids> when the current
+    transaction of <session> commits.
+    """
+    session.info.setdefault(_CHANGED_WORKFLOWS, set()).update(workflow_ids)
+
+
+_BUMP_VERSIONS = text("""
+    UPDATE workflow SET change_seq = workflow.change_seq + 1
+    FROM (
+        SELECT id FROM workflow WHERE id = ANY(:workflow_ids)
+        ORDER BY id FOR NO KEY UPDATE
+    ) AS locked
+    WHERE workflow.id = locked.id
+""")
+
+
+def _bump_versions(session):
+    # before_commit runs before the final flush, whose changes must be
+    # included
+    session.flush()
+    workflow_ids = session.info.pop(_CHANGED_WORKFLOWS, None)
+    if workflow_ids:
+        session.execute(_BUMP_VERSIONS,
+                {'workflow_ids': sorted(workflow_ids)})
+
+
+def _forget(session, *args):
+    session.info.pop(_CHANGE_SEQ, None)
+    session.info.pop(_CHANGED_WORKFLOWS, None)
+
+event.listen(Session, 'before_commit', _bump_versions)
+event.listen(Session, 'after_commit', _forget)
+event.listen(Session, 'after_rollback', _forget)
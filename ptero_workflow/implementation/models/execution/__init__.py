@@ -1,6 +1,7 @@
 from .execution_base import *
 from .task_execution import *
 from .method_execution import *
+from .status_count import *
 
 
 # flake8: noqa
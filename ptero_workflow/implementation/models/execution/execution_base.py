@@ -1,9 +1,13 @@
 from ..base import Base
-from ..json_type import JSON, MutableJSONDict
+from ..change_seq import get_change_seq, workflows_changed
+from ..json_type import JSONB, MutableJSONDict
+from ptero_workflow.implementation import change_bus
 from ptero_workflow.urls import url_for
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text, String
-from sqlalchemy import UniqueConstraint, func
-from sqlalchemy.orm import backref, relationship
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+from sqlalchemy import Text, String
+from sqlalchemy import Index, UniqueConstraint, event, func, inspect
+from sqlalchemy.orm import Session, backref, relationship
+from sqlalchemy.orm.session import object_session
 from ptero_workflow.implementation.exceptions import (OutputsAlreadySet,
         ImmutableUpdateError, InvalidStatusError)
 from operator import attrgetter
@@ -21,6 +25,10 @@ class Execution(Base):
     __table_args__ = (
         UniqueConstraint('method_id', 'color'),
         UniqueConstraint('task_id', 'color'),
+        Index('ix_execution_workflow_id_timestamp_id',
+            'workflow_id', 'timestamp', 'id'),
+        Index('ix_execution_workflow_id_change_seq',
+            'workflow_id', 'change_seq'),
     )
 
     id = Column(Integer, primary_key=True)
@@ -35,8 +43,8 @@ class Execution(Base):
     _status = Column('status', Text, index=True, nullable=False)
 
     data = Column(MutableJSONDict, nullable=False, default=lambda:{})
-    colors = Column(JSON)
-    begins = Column(JSON)
+    colors = Column(JSONB)
+    begins = Column(JSONB)
 
     workflow_id = Column(Integer, ForeignKey('workflow.id', ondelete='CASCADE'),
         nullable=False, index=True)
@@ -45,6 +53,10 @@ class Execution(Base):
     timestamp = Column(DateTime(timezone=True), default=func.now(),
             index=True, nullable=False)
 
+    # The change sequence number (see change_seq) of the transaction that
+    # last created or changed the execution.
+    change_seq = Column(BigInteger, nullable=False)
+
     type = Column(String, index=True, nullable=False)
     __mapper_args__ = {
             'polymorphic_on': 'type',
@@ -219,9 +231,57 @@ class Execution(Base):
         pass
 
 
+def _get_change_seq(connection, target):
+    # All of a transaction's changes share one number.
+    session = object_session(target)
+    workflows_changed(session, [target.workflow_id])
+    return get_change_seq(session, connection)
+
+
+def _stamp_new_execution(mapper, connection, target):
+    target.change_seq = _get_change_seq(connection, target)
+
+
+def _stamp_change(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        target.change_seq = _get_change_seq(connection, target)
+
+
+def _announced_executions(session):
+    # after_flush still sees the flushed objects and their changes
+    for instance in session.new:
+        if isinstance(instance, Execution):
+            yield instance
+    for instance in session.dirty:
+        if (isinstance(instance, Execution) and
+                inspect(instance).attrs._status.history.has_changes()):
+            yield instance
+
+
+def _announce_flushed_executions(session, flush_context):
+    # one statement announces all of a flush's new executions and status
+    # changes, however many there are
+    changes = [(e.workflow_id, 'execution', e.id, e.change_seq)
+            for e in _announced_executions(session)]
+    if changes:
+        change_bus.notify_many(session, changes)
+
+
+event.listen(Execution, 'before_insert', _stamp_new_execution, propagate=True)
+event.listen(Execution, 'before_update', _stamp_change, propagate=True)
+event.listen(Session, 'after_flush', _announce_flushed_executions)
+
+
 class ExecutionStatusHistory(Base):
     __tablename__ = 'execution_status_history'
 
+    __table_args__ = (
+        Index('ix_execution_status_history_workflow_id_timestamp_id',
+            'workflow_id', 'timestamp', 'id'),
+        Index('ix_execution_status_history_workflow_id_change_seq',
+            'workflow_id', 'change_seq'),
+    )
+
     id = Column(Integer, primary_key=True)
     execution_id = Column(Integer, ForeignKey('execution.id',
             ondelete='CASCADE'), index=True, nullable=False)
@@ -239,6 +299,10 @@ class ExecutionStatusHistory(Base):
         nullable=False, index=True)
     workflow = relationship('Workflow', foreign_keys=[workflow_id])
 
+    # The change sequence number of the execution's change, or null for
+    # updates recorded before these were numbered.
+    change_seq = Column(BigInteger, nullable=True)
+
     def as_dict(self, detailed=False):
         return {'timestamp': str(self.timestamp), 'status': self.status}
 
@@ -248,3 +312,9 @@ class ExecutionStatusHistory(Base):
                 'timestamp': str(self.timestamp),
                 'status': self.status
         }
+
+
+def _stamp_status_update(mapper, connection, target):
+    target.change_seq = _get_change_seq(connection, target)
+
+event.listen(ExecutionStatusHistory, 'before_insert', _stamp_status_update)
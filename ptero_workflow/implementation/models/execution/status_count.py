@@ -0,0 +1,147 @@
+from ..base import Base
+from .execution_base import Execution
+from collections import defaultdict
+from sqlalchemy import Column, ForeignKey, Integer, Text, UniqueConstraint
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+__all__ = ['ExecutionStatusCount', 'check_status_counts',
+        'rebuild_status_counts']
+
+
+class ExecutionStatusCount(Base):
+    """
+    The number of a task's or method's executions that are in <status>.
+    These rows are kept up to date whenever executions are flushed, so
+    reports can read them instead of counting executions.
+    """
+    __tablename__ = 'execution_status_count'
+
+    __table_args__ = (
+        UniqueConstraint('task_id', 'status'),
+        UniqueConstraint('method_id', 'status'),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    workflow_id = Column(Integer, ForeignKey('workflow.id', ondelete='CASCADE'),
+        nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey('task.id', ondelete='CASCADE'),
+            nullable=True)
+    method_id = Column(Integer, ForeignKey('method.id', ondelete='CASCADE'),
+            nullable=True)
+    status = Column(Text, nullable=False)
+    count = Column(Integer, nullable=False)
+
+
+_UPSERTS = {
+    'task_id': text("""
+        INSERT INTO execution_status_count
+            (workflow_id, task_id, status, count)
+        VALUES (:workflow_id, :node_id, :status, :delta)
+        ON CONFLICT (task_id, status) DO UPDATE
+        SET count = execution_status_count.count + EXCLUDED.count
+    """),
+    'method_id': text("""
+        INSERT INTO execution_status_count
+            (workflow_id, method_id, status, count)
+        VALUES (:workflow_id, :node_id, :status, :delta)
+        ON CONFLICT (method_id, status) DO UPDATE
+        SET count = execution_status_count.count + EXCLUDED.count
+    """),
+}
+
+
+def _node(execution):
+    if execution.method_id is not None:
+        return 'method_id', execution.method_id
+    else:
+        return 'task_id', execution.task_id
+
+
+def _status_deltas(session):
+    deltas = defaultdict(int)
+    for execution in session.new:
+        if isinstance(execution, Execution):
+            deltas[_node(execution) + (execution.workflow_id,
+                execution._status)] += 1
+
+    for execution in session.dirty:
+        if isinstance(execution, Execution):
+            added, _, deleted = inspect(execution).attrs._status.history
+            if added and deleted:
+                key = _node(execution) + (execution.workflow_id,)
+                deltas[key + (deleted[0],)] -= 1
+                deltas[key + (added[0],)] += 1
+
+    # Executions are only deleted along with their workflow, whose counts are
+    # removed by the cascade.
+    return deltas
+
+
+def _update_status_counts(session, flush_context):
+    # Counts are updated in a fixed order so that concurrent transactions
+    # changing the same tasks' executions cannot deadlock.
+    for key, delta in sorted(_status_deltas(session).iteritems()):
+        column, node_id, workflow_id, status = key
+        if delta:
+            session.execute(_UPSERTS[column], {'workflow_id': workflow_id,
+                'node_id': node_id, 'status': status, 'delta': delta})
+
+event.listen(Session, 'after_flush', _update_status_counts)
+
+
+def _counted_executions(workflow_id):
+    E = Execution.__table__
+    query = select([E.c.workflow_id, E.c.task_id, E.c.method_id, E.c.status,
+        func.count(E.c.id)]).group_by(E.c.workflow_id, E.c.task_id,
+                E.c.method_id, E.c.status)
+    if workflow_id is not None:
+        query = query.where(E.c.workflow_id == workflow_id)
+    return query
+
+
+def check_status_counts(session, workflow_id=None):
+    """
+    Return a list of (workflow_id, task_id, method_id, status, expected,
+    actual) for every stored count that differs from the executions.
+    """
+    expected = {tuple(row[:4]): row[4] for row in session.execute(
+        _counted_executions(workflow_id))}
+
+    C = ExecutionStatusCount.__table__
+    query = select([C.c.workflow_id, C.c.task_id, C.c.method_id, C.c.status,
+        C.c.count])
+    if workflow_id is not None:
+        query = query.where(C.c.workflow_id == workflow_id)
+    actual = {tuple(row[:4]): row[4] for row in session.execute(query)}
+
+    return sorted(key + (expected.get(key, 0), actual.get(key, 0))
+            for key in set(expected) | set(actual)
+            if expected.get(key, 0) != actual.get(key, 0))
+
+
+_LOCK_WORKFLOW = text("""
+    SELECT id FROM workflow WHERE id = :workflow_id FOR UPDATE
+""")
+
+_LOCK_EXECUTIONS = text("""
+    SELECT id FROM execution WHERE workflow_id = :workflow_id FOR SHARE
+""")
+
+
+def rebuild_status_counts(session, workflow_id):
+    """
+    Replace the stored counts of a workflow with counts of its executions.
+    """
+    # Until the counts are replaced, no execution can be added to the
+    # workflow (its foreign key check needs a lock on the workflow row) and
+    # none of its executions can change status, so that no status change is
+    # counted twice or lost.  Other workflows are not blocked.
+    session.execute(_LOCK_WORKFLOW, {'workflow_id': workflow_id})
+    session.execute(_LOCK_EXECUTIONS, {'workflow_id': workflow_id})
+
+    C = ExecutionStatusCount.__table__
+    session.execute(C.delete().where(C.c.workflow_id == workflow_id))
+    session.execute(C.insert().from_select(['workflow_id', 'task_id',
+        'method_id', 'status', 'count'], _counted_executions(workflow_id)))
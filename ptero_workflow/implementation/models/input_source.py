@@ -1,16 +1,19 @@
 from . import result
 from .base import Base
-from .json_type import JSON
+from .json_type import JSONB
 from sqlalchemy import Column, UniqueConstraint
 from sqlalchemy import ForeignKey, Integer, Text
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import and_, literal, union_all
+from sqlalchemy.orm import defer, relationship, backref
 from sqlalchemy.orm.session import object_session
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from ..exceptions import MissingResultError
+from ptero_workflow.implementation import result_cache
+from collections import namedtuple
 from ptero_common import nicer_logging
 
 
-__all__ = ['InputSource']
+__all__ = ['InputSource', 'get_inputs_for_task']
 
 
 LOG = nicer_logging.getLogger(__name__)
@@ -32,7 +35,7 @@ class InputSource(Base):
     source_property      = Column(Text, nullable=False, index=True)
     destination_property = Column(Text, nullable=False, index=True)
 
-    parallel_depths = Column(JSON, nullable=False)
+    parallel_depths = Column(JSONB, nullable=False)
 
     source_task = relationship('Task', foreign_keys=[source_id])
     destination_task = relationship('Task', backref=backref('input_sources',
@@ -53,10 +56,23 @@ class InputSource(Base):
         return indexes
 
     def get_data(self, colors, begins):
+        r = self._get_result(colors, begins)
+        indexes = self.parallel_indexes(colors, begins)
+
+        key = result_cache.key(r.id, indexes)
+        found, data = result_cache.get(self.workflow_id, key)
+        if found:
+            return data
+
+        data = r.get_data(indexes)
+        result_cache.put(self.workflow_id, key, data)
+        return data
+
+    def _get_result(self, colors, begins):
         s = object_session(self)
 
         try:
-            r = s.query(result.Result
+            return s.query(result.Result).options(defer('data')
                     ).filter_by(task=self.source_task, name=self.source_property
                     ).filter(result.Result.color.in_(colors)).one()
         except NoResultFound:
@@ -65,13 +81,145 @@ class InputSource(Base):
                     self.source_task.name, self.source_task.id,
                     self.source_property, str(colors)))
 
-        indexes = self.parallel_indexes(colors, begins)
-        return r.get_data(indexes)
-
     def get_size(self, colors, begins):
         indexes = self.parallel_indexes(colors, begins)
-        s = object_session(self)
-        r = s.query(result.Result
-                ).filter_by(task=self.source_task, name=self.source_property
-                ).filter(result.Result.color.in_(colors)).one()
+        r = self._get_result(colors, begins)
         return r.get_size(indexes)
+
+
+InputResult = namedtuple('InputResult', ['destination_property', 'result_id',
+    'has_elements', 'is_inline', 'blob_location', 'indexes'])
+
+
+def find_input_results(task, colors, begins):
+    """
+    Return an InputResult for each of the task's input sources: the id of
+    the source Result and the indexes to apply to its data, found with one
+    query and without loading any data.
+    """
+    s = object_session(task)
+    Result = result.Result
+    ResultBlob = result.ResultBlob
+
+    rows = s.query(InputSource, Result.id, Result.has_elements,
+                Result.is_inline, ResultBlob.location
+            ).outerjoin(Result, and_(
+                Result.task_id == InputSource.source_id,
+                Result.name == InputSource.source_property,
+                Result.color.in_(colors))
+            ).outerjoin(ResultBlob, ResultBlob.hash == Result.blob_hash
+            ).filter(InputSource.destination_id == task.id
+            ).order_by(InputSource.id).all()
+
+    found_results = {}
+    for source, result_id, has_elements, is_inline, blob_location in rows:
+        if result_id is None:
+            raise MissingResultError("No result found for task (%s:%s) with "
+                    "name (%s) and color one of %s" % (
+                    source.source_task.name, source.source_id,
+                    source.source_property, str(colors)))
+        elif source in found_results:
+            raise MultipleResultsFound("Multiple results found for task "
+                    "(%s:%s) with name (%s) and color one of %s" % (
+                    source.source_task.name, source.source_id,
+                    source.source_property, str(colors)))
+        found_results[source] = InputResult(source.destination_property,
+                result_id, has_elements, is_inline, blob_location,
+                source.parallel_indexes(colors, begins))
+
+    return found_results.values()
+
+
+def get_inputs_for_task(task, colors, begins):
+    """
+    Equivalent to calling get_data on each of the task's input sources, but
+    uses one query to find the results and one more each to extract the
+    (possibly indexed) inline data and array elements of those not in the
+    result cache.  Results whose data is not inline (references, blobs and
+    packed arrays) are resolved through Result.get_data, except for elements
+    of arrays stored one element per row in the database.
+    """
+    inputs = {}
+    missing = []
+    for input_result in find_input_results(task, colors, begins):
+        found, data = result_cache.get(task.workflow_id,
+                _cache_key(input_result))
+        if found:
+            inputs[input_result.destination_property] = data
+        else:
+            missing.append(input_result)
+
+    if missing:
+        loaded = _load_inputs(object_session(task), missing)
+        for input_result in missing:
+            result_cache.put(task.workflow_id, _cache_key(input_result),
+                    loaded[input_result.destination_property])
+        inputs.update(loaded)
+
+    return inputs
+
+
+def _cache_key(input_result):
+    return result_cache.key(input_result.result_id, input_result.indexes)
+
+
+def _load_inputs(s, input_results):
+    inline, elements, others = _partition_inputs(input_results)
+
+    # an index past the end of an array selects no row, which is reported as
+    # null just like indexing past the end of inline data.
+    inputs = {i.destination_property: None for i in inline + elements}
+    inputs.update(_load_inline_inputs(s, inline))
+    inputs.update(_load_element_inputs(s, elements))
+    for input_result in others:
+        r = s.query(result.Result).get(input_result.result_id)
+        inputs[input_result.destination_property] = r.get_data(
+                input_result.indexes)
+
+    return inputs
+
+
+def _partition_inputs(input_results):
+    """
+    Split <input_results> into those with inline data, those selecting an
+    element of an array stored one element per row in the database, and the
+    rest, which are resolved through Result.get_data.
+    """
+    inline = []
+    elements = []
+    others = []
+    for input_result in input_results:
+        if input_result.is_inline:
+            inline.append(input_result)
+        elif (input_result.has_elements and input_result.indexes and
+                input_result.blob_location is None):
+            elements.append(input_result)
+        else:
+            others.append(input_result)
+    return inline, elements, others
+
+
+def _load_inline_inputs(s, input_results):
+    if not input_results:
+        return {}
+
+    queries = [result.data_select(i.result_id, i.indexes,
+                literal(position).label('position'))
+        for position, i in enumerate(input_results)]
+    return {input_results[position].destination_property: data
+            for position, data in s.execute(union_all(*queries))}
+
+
+def _load_element_inputs(s, input_results):
+    if not input_results:
+        return {}
+
+    queries = [result.element_select(i.result_id, i.indexes[0],
+                literal(position).label('position'))
+        for position, i in enumerate(input_results)]
+    inputs = {}
+    for position, data in s.execute(union_all(*queries)):
+        input_result = input_results[position]
+        inputs[input_result.destination_property] = result.get_element(
+                data, input_result.indexes[1:])
+    return inputs
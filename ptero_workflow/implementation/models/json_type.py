@@ -1,39 +1,90 @@
-from sqlalchemy import Integer
+from sqlalchemy import Integer, LargeBinary
 from sqlalchemy.dialects.postgresql import JSON as psqlJSON
+from sqlalchemy.dialects.postgresql import JSONB as psqlJSONB
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm.session import object_session
 from sqlalchemy.sql.functions import GenericFunction
+from sqlalchemy.types import TypeDecorator
+import json
+import zlib
 
 
-__all__ = ['JSON', 'get_data_element']
+__all__ = ['JSON', 'JSONB', 'CompressedJSON', 'get_data_element',
+        'data_element_expression']
 
 
-def get_data_element_postgres_extensions(task, indexes):
+def data_element_expression(column, indexes):
     if indexes:
-        q = task.__class__.data[indexes]
+        return column[indexes]
     else:
-        q = task.__class__.data
+        return column
+
+
+def get_data_element_postgres_extensions(task, indexes):
+    q = data_element_expression(task.__class__.data, indexes)
 
     s = object_session(task)
     tup = s.query(q).filter_by(id=task.id).one()
     return tup[0]
 
 
-class json_array_length(GenericFunction):
+class jsonb_array_length(GenericFunction):
     type = Integer
 
 
 def get_data_size_postgres_extensions(task, indexes):
-    if indexes:
-        q = task.__class__.data[indexes]
-    else:
-        q = task.__class__.data
+    q = data_element_expression(task.__class__.data, indexes)
 
     s = object_session(task)
-    tup = s.query(json_array_length(q)).filter_by(id=task.id).one()
+    tup = s.query(jsonb_array_length(q)).filter_by(id=task.id).one()
     return tup[0]
 
-MutableJSONDict = MutableDict.as_mutable(psqlJSON)
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON stored as bytea: canonical JSON, zlib compressed when it is at least
+    <threshold> bytes long.  Postgres cannot look inside these values, so
+    they are only suitable for data that is read whole.
+    """
+    impl = LargeBinary
+
+    PLAIN = b'j'
+    ZLIB = b'z'
+
+    def __init__(self, threshold=1024, level=6):
+        TypeDecorator.__init__(self)
+        self.threshold = threshold
+        self.level = level
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        return self.encode(json.dumps(value, sort_keys=True,
+                separators=(',', ':')))
+
+    def encode(self, canonical_json):
+        if len(canonical_json) >= self.threshold:
+            return self.ZLIB + zlib.compress(canonical_json, self.level)
+        else:
+            return self.PLAIN + canonical_json
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+
+        return self.decode(value)
+
+    def decode(self, value):
+        value = bytes(value)
+        if value[:1] == self.ZLIB:
+            return json.loads(zlib.decompress(value[1:]))
+        else:
+            return json.loads(value[1:])
+
+
+MutableJSONDict = MutableDict.as_mutable(psqlJSONB)
 JSON = psqlJSON
+JSONB = psqlJSONB
 get_data_element = get_data_element_postgres_extensions
 get_data_size = get_data_size_postgres_extensions
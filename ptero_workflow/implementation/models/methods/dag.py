@@ -1,8 +1,6 @@
 from .method_base import Method
-from ptero_workflow.implementation.models.link import Link
-from ptero_workflow.implementation.models.task import Task
 from sqlalchemy import Column, ForeignKey, Integer
-from sqlalchemy.orm import backref, aliased, relationship
+from sqlalchemy.orm import backref, relationship
 from sqlalchemy.orm.collections import attribute_mapped_collection
 from sqlalchemy.orm.session import object_session
 from ptero_common import statuses
@@ -149,14 +147,10 @@ class DAG(Method):
 
     @property
     def links(self):
-        s = object_session(self)
-        source_task = aliased(Task)
-        destination_task = aliased(Task)
-        return s.query(Link).\
-            join(source_task,source_task.id==Link.source_id).\
-            join(destination_task,destination_task.id==Link.destination_id).\
-            filter(destination_task.parent_id==self.id, source_task.parent_id==self.id).\
-            order_by(source_task.name,destination_task.name).all()
+        links = [l for child in self.child_list for l in child.input_links
+                if l.source_task.parent_id == self.id]
+        return sorted(links, key=lambda l: (l.source_task.name,
+            l.destination_task.name))
 
     def as_dict_for_summary(self):
         result = super(DAG, self).as_dict_for_summary()
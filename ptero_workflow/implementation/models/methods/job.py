@@ -1,11 +1,12 @@
 from ..execution.method_execution import MethodExecution
 from ..json_type import JSON
 from .method_base import Method
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from ptero_workflow.implementation import service_pools
+from sqlalchemy import Column, ForeignKey, Index, Integer, Text, func
 from sqlalchemy.orm.session import object_session
 import celery
 from ptero_common import nicer_logging
-from ptero_common.statuses import (submitted, running,
+from ptero_common.statuses import (scheduled, submitted, running,
         canceled, errored, succeeded, failed)
 
 LOG = nicer_logging.getLogger(__name__)
@@ -13,6 +14,17 @@ LOG = nicer_logging.getLogger(__name__)
 __all__ = ['Job']
 
 
+IN_FLIGHT_STATUSES = ['new', scheduled, submitted, running]
+
+
+# Lets Job._in_flight_counts read only the in-flight executions of the urls
+# it counts rather than scan every execution.
+Index('ix_execution_in_flight_service_url',
+        MethodExecution.__table__.c.data['serviceUrl'].astext,
+        postgresql_where=MethodExecution.__table__.c.status.in_(
+            IN_FLIGHT_STATUSES))
+
+
 class Job(Method):
     __tablename__ = 'job'
     service = 'job'
@@ -22,7 +34,10 @@ class Job(Method):
 
     parameters = Column(JSON, nullable=False)
 
-    service_url = Column(Text, nullable=False)
+    # Exactly one of these is set, see service_url_weights
+    service_url = Column(Text, nullable=True)
+    service_urls = Column(JSON, nullable=True)
+    service_pool = Column(Text, nullable=True)
 
     service_data_to_save = Column(JSON, nullable=False)
 
@@ -173,8 +188,33 @@ class Job(Method):
         return celery.current_app.tasks[
                 'ptero_workflow.implementation.celery_tasks.submit_job.SubmitJob']
 
-    def get_job_submit_url(self, job_id):
-        return '%s/jobs/%s' % (self.service_url, job_id)
+    @property
+    def service_url_weights(self):
+        if self.service_pool is not None:
+            return service_pools.get_pool(self.service_pool)
+        elif self.service_urls is not None:
+            return service_pools.weighted_urls(self.service_urls)
+        else:
+            return {self.service_url: 1}
+
+    def select_service_url(self, execution):
+        weights = self.service_url_weights
+        return service_pools.select_service_url(weights, key=execution.id,
+                get_in_flight_counts=lambda: self._in_flight_counts(weights))
+
+    def _in_flight_counts(self, urls):
+        # Executions are counted from the moment a service url is chosen for
+        # them, not just once the job service has acknowledged them.
+        s = object_session(self)
+        url_column = MethodExecution.data['serviceUrl'].astext
+        rows = s.query(url_column, func.count(MethodExecution.id)).filter(
+                url_column.in_(list(urls)),
+                MethodExecution._status.in_(IN_FLIGHT_STATUSES),
+            ).group_by(url_column)
+        return {url: count for url, count in rows}
+
+    def get_job_submit_url(self, job_id, service_url):
+        return '%s/jobs/%s' % (service_url, job_id)
 
     def get_job_submit_data(self, execution_id):
         submit_data = self.parameters
@@ -205,12 +245,20 @@ class Job(Method):
     def get_parameters(self, detailed=False):
         return self.parameters
 
+    def add_service_url_to_dict(self, result):
+        if self.service_pool is not None:
+            result['servicePool'] = self.service_pool
+        elif self.service_urls is not None:
+            result['serviceUrl'] = self.service_urls
+        else:
+            result['serviceUrl'] = self.service_url
+
     def as_dict(self, detailed):
         result = Method.as_dict(self, detailed)
-        result['serviceUrl'] = self.service_url
+        self.add_service_url_to_dict(result)
         return result;
 
     def as_skeleton_dict(self):
         result = Method.as_skeleton_dict(self)
-        result['serviceUrl'] = self.service_url
+        self.add_service_url_to_dict(result)
         return result;
@@ -164,9 +164,8 @@ class Method(Base):
     def execution_summary(self):
         s = object_session(self)
         rows = s.execute("""
-            SELECT status, count(status)
-            FROM execution WHERE method_id = :id
-            GROUP BY status;
+            SELECT status, count
+            FROM execution_status_count WHERE method_id = :id AND count > 0;
         """, {"id": self.id})
         return {row[0]: row[1] for row in rows}
 
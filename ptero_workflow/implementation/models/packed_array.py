@@ -0,0 +1,45 @@
+import struct
+
+
+__all__ = ['get_packed_type', 'pack', 'unpack', 'ITEM_SIZE']
+
+
+# Homogeneous lists of integers or of floats are stored as little-endian
+# 64-bit values, tagged with their struct format character.
+INTEGER = 'q'
+FLOAT = 'd'
+
+ITEM_SIZE = 8
+
+_MIN_INTEGER = -2 ** 63
+_MAX_INTEGER = 2 ** 63 - 1
+
+
+def get_packed_type(data):
+    """
+    Return the type <data> can be packed as, or None if it is not a list of
+    only integers or only floats.
+    """
+    if not isinstance(data, list) or not data:
+        return None
+
+    if all(_is_integer(x) for x in data):
+        return INTEGER
+    elif all(type(x) is float for x in data):
+        return FLOAT
+    else:
+        return None
+
+
+def _is_integer(x):
+    return (type(x) in (int, long)) and _MIN_INTEGER <= x <= _MAX_INTEGER
+
+
+def pack(data, packed_type):
+    return struct.pack('<%d%s' % (len(data), packed_type), *data)
+
+
+def unpack(buf, packed_type):
+    buf = bytes(buf)
+    return list(struct.unpack('<%d%s' % (len(buf) / ITEM_SIZE, packed_type),
+        buf))
@@ -1,11 +1,70 @@
 from .base import Base
+from .change_seq import get_change_seq, workflows_changed
 from sqlalchemy import Column, UniqueConstraint, Index
-from sqlalchemy import ForeignKey, Integer, Text
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy import BigInteger, Boolean, ForeignKey, Integer, Text
+from sqlalchemy import LargeBinary
+from sqlalchemy import and_, bindparam, event, exists, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, deferred, relationship, backref
+from sqlalchemy.orm.session import object_session
+from ptero_workflow.implementation import blob_storage
+from ptero_workflow.implementation import change_bus
+import hashlib
+import json
 import json_type
+import os
+import packed_array
+import uuid
 
 
-__all__ = ['Result']
+__all__ = ['Result', 'ResultBlob', 'ResultElement']
+
+
+# A result may be a reference rather than hold its data: an ARRAY reference is
+# the array of the results of the same task and name whose parent_color is its
+# color (child i has color reference_begin + i) and a RESULT reference is an
+# element (reference_indexes) of another result.  References make joining
+# parallel results and copying outputs to a parent DAG independent of the size
+# of the data; the data is only assembled when the whole value is requested.
+ARRAY_REFERENCE = 'array'
+RESULT_REFERENCE = 'result'
+
+
+# Array results with at least this many elements are stored one element per
+# row in the result_element table, so that reading a single element (as each
+# parallel child does) does not require Postgres to parse the whole array.
+# Each element is stored as CompressedJSON, so any further indexing of an
+# element is done after it is read.
+ELEMENT_THRESHOLD = int(os.environ.get(
+    'PTERO_WORKFLOW_RESULT_ELEMENT_THRESHOLD', 1000))
+
+
+# Arrays of at least this many integers (or floats) are stored packed as
+# 64-bit values in packed_data, so that an element can be read by its offset.
+# Packing takes precedence over the storage below.
+PACK_THRESHOLD = int(os.environ.get(
+    'PTERO_WORKFLOW_RESULT_PACK_THRESHOLD', 1000))
+
+
+# Results whose canonical JSON is at least this many bytes, and arrays stored
+# one element per row, are stored once in the result_blob table, keyed by the
+# hash of that JSON, and shared by every result with the same data.  The
+# elements of an array blob are kept in result_element, keyed by the blob's
+# hash, rather than in the blob row.
+BLOB_THRESHOLD = int(os.environ.get(
+    'PTERO_WORKFLOW_RESULT_BLOB_THRESHOLD', 64 * 1024))
+
+
+# When blob storage is configured (see blob_storage.get_storage), blobs of at
+# least this many bytes are kept there instead of in the database and are
+# only read when their data is requested.  The elements of an array blob kept
+# there are stored one after the other, and the blob row records where each
+# begins, so that one element can be read without reading the others.  Only
+# arrays are read in part: any other blob kept there (an object or a string)
+# is one gzipped JSON file, which is read whole even to get one key of it.
+STORAGE_THRESHOLD = int(os.environ.get(
+    'PTERO_WORKFLOW_BLOB_STORAGE_THRESHOLD', 8 * 1024 * 1024))
 
 
 class Result(Base):
@@ -24,10 +83,483 @@ class Result(Base):
 
     task = relationship('Task', backref=backref('results', passive_deletes='all'))
 
-    data = Column(json_type.JSON)
+    data = Column(json_type.JSONB)
+    has_elements = Column(Boolean, nullable=False, default=False)
+    blob_hash = Column(Text, ForeignKey('result_blob.hash'), nullable=True,
+            index=True)
+    blob = relationship('ResultBlob')
+    packed_type = Column(Text, nullable=True)
+    packed_data = deferred(Column(LargeBinary, nullable=True))
+
+    # Recorded when the result is written so that split sizes can be found
+    # without reading data: the length of an array result and, if any of its
+    # elements are arrays, the length of each element (null for the others).
+    # Rows written before these were recorded fall back to reading data.
+    size = Column(Integer, nullable=True)
+    element_sizes = Column(json_type.JSONB, nullable=True)
+
+    reference_type = Column(Text, nullable=True)
+    reference_begin = Column(Integer, nullable=True)
+    reference_result_id = Column(Integer,
+            ForeignKey('result.id', ondelete='CASCADE'), nullable=True,
+            index=True)
+    reference_indexes = Column(json_type.JSONB, nullable=True)
+
+    referenced_result = relationship('Result', remote_side=[id])
+
+    def __init__(self, *args, **kwargs):
+        Base.__init__(self, *args, **kwargs)
+        self.size, self.element_sizes = _array_sizes(self.data)
+        self.has_elements = False
+
+        packed_type = packed_array.get_packed_type(self.data)
+        if (packed_type is not None and self.size is not None and
+                self.size >= PACK_THRESHOLD):
+            self.packed_type = packed_type
+            self.packed_data = packed_array.pack(self.data, packed_type)
+            self.data = None
+            return
+
+        canonical_json = json.dumps(self.data, sort_keys=True,
+                separators=(',', ':'))
+        self.has_elements = isinstance(self.data, list) and (
+                self.size >= ELEMENT_THRESHOLD or
+                len(canonical_json) >= BLOB_THRESHOLD)
+        if self.has_elements or len(canonical_json) >= BLOB_THRESHOLD:
+            self.blob_hash = hashlib.sha256(canonical_json).hexdigest()
+            if self.has_elements:
+                self._blob_elements = self.data
+            self.data = None
+            self._blob_json = canonical_json
+
+    @hybrid_property
+    def is_inline(self):
+        return (self.reference_type is None and self.blob_hash is None and
+                self.packed_type is None)
+
+    @is_inline.expression
+    def is_inline(cls):
+        return and_(cls.reference_type.is_(None), cls.blob_hash.is_(None),
+                cls.packed_type.is_(None))
+
+    @property
+    def value(self):
+        if self.is_inline:
+            return self.data
+        else:
+            return self.get_data([])
 
     def get_data(self, indexes):
-        return json_type.get_data_element(self, indexes)
+        if self.reference_type == RESULT_REFERENCE:
+            return self.referenced_result.get_data(
+                    self.reference_indexes + indexes)
+        elif self.reference_type == ARRAY_REFERENCE:
+            return self._get_children_data(indexes)
+        elif self.has_elements:
+            return self._get_element_data(indexes)
+        elif self.blob_hash is not None:
+            return self.blob.get_data(indexes)
+        elif self.packed_type is not None:
+            return self._get_packed_data(indexes)
+        else:
+            return json_type.get_data_element(self, indexes)
+
+    def _get_children_data(self, indexes):
+        if not indexes:
+            return [child.value for child in self._get_children()]
+
+        child = self._get_child(indexes[0])
+        if child is None:
+            return None
+        return child.get_data(indexes[1:])
+
+    def _get_element_data(self, indexes):
+        if not indexes:
+            return self._get_elements()
+        return get_element(self._get_stored_element(indexes[0]), indexes[1:])
 
     def get_size(self, indexes):
-        return json_type.get_data_size(self, indexes)
+        if self.reference_type == RESULT_REFERENCE:
+            return self.referenced_result.get_size(
+                    self.reference_indexes + indexes)
+        elif self.reference_type == ARRAY_REFERENCE and indexes:
+            return self._get_child_size(indexes)
+
+        size = self._get_recorded_size(indexes)
+        if size is not None:
+            return size
+        else:
+            return self._get_stored_size(indexes)
+
+    def _get_child_size(self, indexes):
+        child = self._get_child(indexes[0])
+        if child is None:
+            return None
+        return child.get_size(indexes[1:])
+
+    def _get_stored_size(self, indexes):
+        if self.reference_type == ARRAY_REFERENCE:
+            s = object_session(self)
+            return s.query(func.count(Result.id)).filter_by(
+                    task_id=self.task_id, name=self.name,
+                    parent_color=self.color).scalar()
+        elif self.packed_type is not None:
+            raise ValueError('Cannot get the size of a number')
+        elif self.has_elements:
+            return self._get_element_size(indexes)
+        elif self.blob_hash is not None:
+            return self._get_blob_size(indexes)
+        else:
+            return json_type.get_data_size(self, indexes)
+
+    def _get_recorded_size(self, indexes):
+        if not indexes:
+            return self.size
+        elif len(indexes) == 1 and self.element_sizes is not None:
+            if 0 <= indexes[0] < len(self.element_sizes):
+                return self.element_sizes[indexes[0]]
+
+    def _get_packed_data(self, indexes):
+        if not indexes:
+            return packed_array.unpack(self.packed_data, self.packed_type)
+
+        index = indexes[0]
+        if index < 0:
+            index += self.size
+        if len(indexes) > 1 or not 0 <= index < self.size:
+            return None
+
+        s = object_session(self)
+        item = s.query(func.substring(Result.packed_data,
+            index * packed_array.ITEM_SIZE + 1, packed_array.ITEM_SIZE)
+            ).filter_by(id=self.id).scalar()
+        return packed_array.unpack(item, self.packed_type)[0]
+
+    def _get_blob_size(self, indexes):
+        return len(self.blob.get_data(indexes))
+
+    def _get_stored_element(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            return None
+
+        s = object_session(self)
+        if self.blob.location is None:
+            return s.query(ResultElement.data).filter_by(
+                    blob_hash=self.blob_hash, index=index).scalar()
+
+        bounds = s.query(func.substring(ResultBlob.element_offsets,
+            index * packed_array.ITEM_SIZE + 1, 2 * packed_array.ITEM_SIZE)
+            ).filter_by(hash=self.blob_hash).scalar()
+        begin, end = packed_array.unpack(bounds, packed_array.INTEGER)
+        return ResultElement.data.type.decode(blob_storage.get_storage().read(
+            self.blob.location, begin, end - begin))
+
+    def _get_element_size(self, indexes):
+        if indexes:
+            element = get_element(self._get_stored_element(indexes[0]),
+                    indexes[1:])
+            return None if element is None else len(element)
+        elif self.blob.location is not None:
+            return self.size
+        else:
+            s = object_session(self)
+            return s.query(func.count(ResultElement.index)).filter_by(
+                    blob_hash=self.blob_hash).scalar()
+
+    def _get_elements(self):
+        if self.blob.location is not None:
+            return self.blob.get_elements()
+
+        s = object_session(self)
+        return [data for (data,) in s.query(ResultElement.data).filter_by(
+            blob_hash=self.blob_hash).order_by(ResultElement.index)]
+
+    def _get_child(self, index):
+        if self.reference_begin is None or index < 0:
+            return None
+        s = object_session(self)
+        return s.query(Result).filter_by(task_id=self.task_id,
+                name=self.name, color=self.reference_begin + index).first()
+
+    def _get_children(self):
+        s = object_session(self)
+        return s.query(Result).filter_by(task_id=self.task_id,
+                name=self.name, parent_color=self.color
+                ).order_by(Result.color).all()
+
+
+class ResultBlob(Base):
+    __tablename__ = 'result_blob'
+
+    hash = Column(Text, primary_key=True)
+    data = deferred(Column(json_type.CompressedJSON(), nullable=True))
+    has_elements = Column(Boolean, nullable=False, default=False)
+
+    # where the blob is kept when it is not in the database and the length
+    # of its JSON
+    location = Column(Text, nullable=True)
+    size = Column(BigInteger, nullable=True)
+
+    # for an array blob kept outside the database, the packed offsets of its
+    # elements followed by the length of the stored content
+    element_offsets = deferred(Column(LargeBinary, nullable=True))
+
+    def get_data(self, indexes):
+        if self.location is None:
+            data = self.data
+        else:
+            # array blobs with elements are read by offset instead (see
+            # Result._get_stored_element), so this reads a whole object
+            with blob_storage.get_storage().open(self.location) as f:
+                data = json.load(f)
+        return get_element(data, indexes)
+
+    def get_elements(self):
+        offsets = packed_array.unpack(self.element_offsets,
+                packed_array.INTEGER)
+        content = blob_storage.get_storage().read(self.location, 0,
+                offsets[-1])
+        return [ResultElement.data.type.decode(content[begin:end])
+                for begin, end in zip(offsets, offsets[1:])]
+
+
+class ResultElement(Base):
+    __tablename__ = 'result_element'
+
+    blob_hash = Column(Text,
+            ForeignKey('result_blob.hash', ondelete='CASCADE'),
+            primary_key=True)
+    index = Column(Integer, primary_key=True, autoincrement=False)
+
+    data = Column(json_type.CompressedJSON())
+
+
+def data_select(result_id, indexes, *extra_columns):
+    """
+    Return a SELECT of the (possibly indexed) data of an inline result,
+    labeled 'data', following any <extra_columns>.
+    """
+    data = json_type.data_element_expression(Result.data, indexes)
+    return select(list(extra_columns) + [data.label('data')]
+            ).where(Result.id == result_id)
+
+
+def element_select(result_id, index, *extra_columns):
+    """
+    Return a SELECT of element <index> of a result stored one element per row
+    in the database, labeled 'data', following any <extra_columns>.  Elements
+    are compressed, so any further indexes must be applied with get_element.
+    """
+    if index < 0:
+        index = Result.size + index
+    source = Result.__table__.join(ResultElement.__table__,
+            ResultElement.blob_hash == Result.blob_hash)
+    return select(list(extra_columns) + [ResultElement.data.label('data')]
+            ).select_from(source).where(and_(Result.id == result_id,
+                ResultElement.index == index))
+
+
+def create_array_result(session, task_id, name, color, parent_color):
+    """
+    Insert the result named <name> of color <color> whose data is the array
+    of the results of its child colors, ordered by color.  The result is an
+    ARRAY_REFERENCE to the child results, so no data is copied.
+    """
+    result_id = session.execute(text("""
+        INSERT INTO result (task_id, name, color, parent_color,
+            reference_type, reference_begin, size, has_elements)
+        SELECT :task_id, :name, :color, :parent_color,
+            :reference_type, min(color), count(*), false
+        FROM result
+        WHERE task_id = :task_id AND name = :name AND parent_color = :color
+        RETURNING id
+    """), {
+        'task_id': task_id,
+        'name': name,
+        'color': color,
+        'parent_color': parent_color,
+        'reference_type': ARRAY_REFERENCE,
+    }).scalar()
+    _announce_new_results(session, [(task_id, result_id)])
+
+
+def delete_unreferenced_blobs(session, hashes):
+    """
+    Delete those of the blobs with the given <hashes> that are no longer used
+    by any result, along with their elements, skipping any that are being
+    written by another transaction.  Blob files are removed once the
+    transaction commits.
+    """
+    hashes = [h for h in hashes if session.execute(select([
+        func.pg_try_advisory_xact_lock(_blob_lock_key(h))])).scalar()]
+    if not hashes:
+        return
+
+    locations = session.execute(ResultBlob.__table__.delete().where(and_(
+        ResultBlob.hash.in_(hashes),
+        ~exists().where(Result.blob_hash == ResultBlob.hash))
+        ).returning(ResultBlob.location))
+    session.info.setdefault(_DELETED_FILES, []).extend(
+            location for (location,) in locations if location is not None)
+
+
+# Blob files are written when their rows are inserted, but only deleted after
+# the transaction that deleted their rows commits.  Each row has its own file,
+# so the files written by a transaction that rolls back can be removed
+# without affecting other writers of the same blob.
+_WRITTEN_FILES = 'ptero_workflow.written_blob_files'
+_DELETED_FILES = 'ptero_workflow.deleted_blob_files'
+
+
+def _delete_files(session, key):
+    locations = session.info.pop(key, [])
+    if locations:
+        storage = blob_storage.get_storage()
+        for location in locations:
+            storage.delete(location)
+
+
+def _delete_deleted_files(session):
+    session.info.pop(_WRITTEN_FILES, None)
+    _delete_files(session, _DELETED_FILES)
+
+
+def _delete_written_files(session):
+    session.info.pop(_DELETED_FILES, None)
+    _delete_files(session, _WRITTEN_FILES)
+
+
+def _blob_lock_key(blob_hash):
+    return int(blob_hash[:15], 16)
+
+
+def get_element(data, indexes):
+    for index in indexes:
+        try:
+            data = data[index]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return data
+
+
+def _array_sizes(data):
+    if not isinstance(data, list):
+        return None, None
+
+    element_sizes = [len(e) if isinstance(e, list) else None for e in data]
+    if any(size is not None for size in element_sizes):
+        return len(data), element_sizes
+    else:
+        return len(data), None
+
+
+def _insert_blob(mapper, connection, target):
+    blob_json = getattr(target, '_blob_json', None)
+    if blob_json is None:
+        return
+
+    # holding this lock keeps delete_unreferenced_blobs away from the blob
+    # until the result using it is committed
+    connection.execute(select([func.pg_advisory_xact_lock_shared(
+        _blob_lock_key(target.blob_hash))]))
+
+    storage = blob_storage.get_storage()
+    if storage is not None and len(blob_json) >= STORAGE_THRESHOLD:
+        _insert_stored_blob(connection, storage, target, blob_json)
+    elif target.has_elements:
+        inserted = connection.execute(text("""
+            INSERT INTO result_blob (hash, has_elements, size)
+            VALUES (:hash, true, :size)
+            ON CONFLICT (hash) DO NOTHING
+            RETURNING hash
+        """), hash=target.blob_hash, size=len(blob_json)).first()
+        if inserted is not None:
+            _insert_elements(connection, target.blob_hash,
+                    target._blob_elements)
+    else:
+        connection.execute(text("""
+            INSERT INTO result_blob (hash, data, size)
+            VALUES (:hash, :data, :size)
+            ON CONFLICT (hash) DO NOTHING
+        """).bindparams(bindparam('data', type_=LargeBinary)),
+            hash=target.blob_hash, size=len(blob_json),
+            data=ResultBlob.data.type.encode(blob_json))
+
+
+def _insert_stored_blob(connection, storage, target, blob_json):
+    exists_already = connection.execute(select([ResultBlob.hash]).where(
+        ResultBlob.hash == target.blob_hash)).first()
+    if exists_already is not None:
+        return
+
+    name = '%s-%s' % (target.blob_hash, uuid.uuid4().hex)
+    session = object_session(target)
+    if target.has_elements:
+        location = storage.location(name, suffix='.elements')
+        offsets = storage.put_parts(location, [
+            ResultElement.data.type.process_bind_param(e, None)
+            for e in target._blob_elements])
+        element_offsets = packed_array.pack(offsets, packed_array.INTEGER)
+    else:
+        location = storage.location(name)
+        storage.put(location, blob_json)
+        element_offsets = None
+    session.info.setdefault(_WRITTEN_FILES, []).append(location)
+
+    inserted = connection.execute(text("""
+        INSERT INTO result_blob (hash, has_elements, location, size,
+            element_offsets)
+        VALUES (:hash, :has_elements, :location, :size, :element_offsets)
+        ON CONFLICT (hash) DO NOTHING
+        RETURNING hash
+    """).bindparams(bindparam('element_offsets', type_=LargeBinary)),
+        hash=target.blob_hash, has_elements=target.has_elements,
+        location=location, size=len(blob_json),
+        element_offsets=element_offsets).first()
+    if inserted is None:
+        session.info[_WRITTEN_FILES].remove(location)
+        storage.delete(location)
+
+
+def _insert_elements(connection, blob_hash, elements):
+    connection.execute(text("""
+        INSERT INTO result_element (blob_hash, index, data)
+        SELECT :hash, element.ordinality - 1, element.data
+        FROM unnest(CAST(:data AS bytea[]))
+            WITH ORDINALITY AS element (data, ordinality)
+    """).bindparams(bindparam('data', type_=postgresql.ARRAY(LargeBinary))),
+        hash=blob_hash, data=[ResultElement.data.type.process_bind_param(
+            e, None) for e in elements])
+
+
+_TASK_WORKFLOWS = text("""
+    SELECT id, workflow_id FROM task WHERE id = ANY(:task_ids)
+""")
+
+
+def _announce_new_results(session, results):
+    """
+    Announce <results>, a list of (task_id, result_id), on the change bus
+    and bump the versions of their workflows when the transaction commits.
+    """
+    workflow_ids = dict(session.execute(_TASK_WORKFLOWS,
+        {'task_ids': sorted(set(t for t, _ in results))}).fetchall())
+    workflows_changed(session, workflow_ids.values())
+    change_seq = get_change_seq(session, session)
+    change_bus.notify_many(session, [(workflow_ids[task_id], 'result',
+        result_id, change_seq) for task_id, result_id in results])
+
+
+def _announce_flushed_results(session, flush_context):
+    results = [(r.task_id, r.id) for r in session.new
+            if isinstance(r, Result)]
+    if results:
+        _announce_new_results(session, results)
+
+
+event.listen(Result, 'before_insert', _insert_blob)
+event.listen(Session, 'after_flush', _announce_flushed_results)
+event.listen(Session, 'after_commit', _delete_deleted_files)
+event.listen(Session, 'after_rollback', _delete_written_files)
@@ -1,4 +1,5 @@
 from .task_base import Task
+from .. import input_source
 from sqlalchemy import Column, ForeignKey, Integer
 from sqlalchemy.orm.session import object_session
 from ptero_common import nicer_logging
@@ -54,9 +55,11 @@ class OutputConnector(Task):
         begins = group.get('begin_lineage', []) + [group['begin']]
         parent_color = _get_parent_color(colors)
 
-        data = self.get_inputs(colors, begins)
+        references = {i.destination_property: (i.result_id, i.indexes)
+                for i in input_source.find_input_results(self, colors, begins)}
 
-        self.parent.task.set_outputs(data, color, parent_color)
+        self.parent.task.set_output_references(references, color,
+                parent_color)
         s = object_session(self)
         s.commit()
 
@@ -332,15 +332,8 @@ class Task(Base, PetriMixin):
         for output_name in self.output_names:
             source, name, parallel_depths = self.resolve_output_source(s,
                     output_name, [])
-            results = s.query(result.Result
-                    ).filter_by(task=source, name=name, parent_color=color
-                    ).order_by('result.color'
-                    ).all()
-
-            array_result = result.Result(task=source, name=name,
-                    color=color, parent_color=parent_color,
-                    data=[r.data for r in results])
-            s.add(array_result)
+            result.create_array_result(s, task_id=source.id, name=name,
+                    color=color, parent_color=parent_color)
 
         s.commit()
 
@@ -387,40 +380,43 @@ class Task(Base, PetriMixin):
 
     @property
     def input_tasks(self):
-        source_ids = set([l.source_id for l in self.input_links])
-        if source_ids:
-            s = object_session(self)
-            return s.query(Task).filter(Task.id.in_(source_ids)).all()
-        else:
-            return []
+        return _distinct_tasks(l.source_task for l in self.input_links)
 
     @property
     def output_tasks(self):
-        destination_ids = set([l.destination_id for l in self.output_links])
-        if destination_ids:
-            s = object_session(self)
-            return s.query(Task).filter(
-                    Task.id.in_(destination_ids)).all()
-        else:
-            return []
+        return _distinct_tasks(l.destination_task for l in self.output_links)
 
     def set_outputs(self, outputs, color, parent_color):
-        for output_name in self.output_names:
+        for output_name in self._checked_output_names(outputs):
+            result.Result(task=self, name=output_name,
+                    data=outputs[output_name], color=color,
+                    parent_color=parent_color)
+
+    def set_output_references(self, references, color, parent_color):
+        """
+        Like set_outputs, but <references> maps each output name to the
+        (result_id, indexes) of the data rather than to the data itself.
+        """
+        for output_name in self._checked_output_names(references):
+            result_id, indexes = references[output_name]
+            result.Result(task=self, name=output_name, color=color,
+                    parent_color=parent_color,
+                    reference_type=result.RESULT_REFERENCE,
+                    reference_result_id=result_id,
+                    reference_indexes=indexes)
+
+    def _checked_output_names(self, outputs):
+        output_names = self.output_names
+        for output_name in output_names:
             if output_name not in outputs.keys():
                 raise exceptions.MissingOutputError(
                         "No value specified for output (%s) on task (%s:%s), "
                         "outputs specified were: %s" % (output_name, self.name,
                             self.id, str(outputs.keys())))
-            else:
-                result.Result(task=self, name=output_name,
-                        data=outputs[output_name], color=color,
-                        parent_color=parent_color)
+        return output_names
 
     def get_inputs(self, colors, begins):
-        inputs = {}
-        for source in self.input_sources:
-            inputs[source.destination_property] = source.get_data(
-                    colors, begins)
+        inputs = input_source.get_inputs_for_task(self, colors, begins)
 
         LOG.debug('Got inputs for Task (%s:%s), colors=%s in workflow %s: %s',
                 self.name, self.id, colors, self.workflow.name, inputs)
@@ -544,7 +540,7 @@ class Task(Base, PetriMixin):
         s = object_session(self)
         results = s.query(result.Result).filter_by(task=self, color=color).all()
         if results:
-            return {r.name: r.data for r in results}
+            return {r.name: r.value for r in results}
 
 
 def _get_parent_color(colors):
@@ -553,3 +549,9 @@ def _get_parent_color(colors):
 
     else:
         return colors[-2]
+
+
+def _distinct_tasks(tasks):
+    # Linked tasks are found in the identity map when the workflow was loaded
+    # with a WorkflowTree, so this issues no queries then.
+    return sorted(set(tasks), key=lambda t: t.id)
@@ -103,8 +103,12 @@ NAME_SYNONYMS = {
 
 
 def get_sorted_webhook_dict(entity):
+    return format_webhooks(entity.webhooks)
+
+
+def format_webhooks(webhooks):
     unsorted_webhook_dict = defaultdict(list)
-    for webhook in entity.webhooks:
+    for webhook in webhooks:
         unsorted_webhook_dict[webhook.name].append(webhook.url)
 
     return format_dict_of_lists(unsorted_webhook_dict)
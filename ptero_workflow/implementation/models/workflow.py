@@ -1,7 +1,10 @@
 from .base import Base
+from .change_seq import get_change_seq
+from ptero_workflow.implementation import change_bus
 from ptero_workflow.urls import url_for
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, Text, event
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy.orm.session import object_session
 import base64
 from ptero_common import nicer_logging
 import os
@@ -43,6 +46,10 @@ class Workflow(Base):
             passive_deletes='all'),
             foreign_keys=[parent_execution_id])
 
+    # The workflow's version, bumped whenever a transaction that changed its
+    # executions or results commits (see change_seq).
+    change_seq = Column(BigInteger, nullable=False, default=0)
+
     start_place_name = 'workflow-start-place'
 
     # This is the convention of the Petri service that the first token has
@@ -187,3 +194,10 @@ class Workflow(Base):
             'initialMarking': [self.start_place_name],
             'transitions': self.get_petri_transitions(),
         }
+
+
+def _announce_deleted_workflow(mapper, connection, target):
+    change_bus.notify(connection, target.id, 'workflow', target.id,
+            get_change_seq(object_session(target), connection))
+
+event.listen(Workflow, 'after_delete', _announce_deleted_workflow)
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import json
+import os
+import threading
+
+
+__all__ = ['get', 'put', 'key', 'invalidate_workflow', 'stats']
+
+
+# Results are never modified once written, so values read from them can be
+# shared by every request and task handled by this process.  Values are keyed
+# by the id of the result they were read from (and the indexes applied to
+# it), so every parallel child reading the same upstream result shares them.
+# Values are kept serialized, so callers always get their own copy, and the
+# cache is bounded by the total length of the serialized values.  A size of
+# 0 disables it.
+#
+# Result ids are never reused, so the entries of a workflow deleted by
+# another process are never read again and are simply evicted in time.
+MAX_BYTES = int(os.environ.get('PTERO_WORKFLOW_RESULT_CACHE_BYTES',
+    64 * 1024 * 1024))
+
+
+class ResultCache(object):
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            serialized = self._entries.pop(key, None)
+            if serialized is None:
+                self.misses += 1
+                return False, None
+            self._entries[key] = serialized
+            self.hits += 1
+        return True, json.loads(serialized)
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+
+        serialized = json.dumps(value)
+        if len(serialized) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = serialized
+            self.bytes += len(serialized)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def invalidate_workflow(self, workflow_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == workflow_id]:
+                self.bytes -= len(self._entries.pop(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_CACHE = ResultCache(MAX_BYTES)
+
+
+def get(workflow_id, key):
+    """
+    Return (found, value) for the value cached under <key> for the workflow.
+    """
+    return _CACHE.get((workflow_id,) + key)
+
+
+def put(workflow_id, key, value):
+    _CACHE.put((workflow_id,) + key, value)
+
+
+def key(result_id, indexes):
+    """
+    Return the key of the value read from the result with <result_id> at
+    <indexes>.
+    """
+    return (result_id, tuple(indexes))
+
+
+def invalidate_workflow(workflow_id):
+    """
+    Drop the workflow's cached values from this process's cache.
+    """
+    _CACHE.invalidate_workflow(workflow_id)
+
+
+def stats():
+    return _CACHE.stats()
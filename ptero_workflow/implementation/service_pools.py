@@ -0,0 +1,127 @@
+from ptero_workflow.implementation import exceptions
+import json
+import os
+
+
+__all__ = ['get_pool', 'weighted_urls', 'select_service_url',
+        'load_pools']
+
+
+LEAST_IN_FLIGHT = 'least-in-flight'
+WEIGHTED_ROUND_ROBIN = 'weighted-round-robin'
+
+STRATEGIES = [LEAST_IN_FLIGHT, WEIGHTED_ROUND_ROBIN]
+
+
+def load_pools(config):
+    """
+    Parse and validate <config>, a JSON object mapping pool name to either a
+    list of service urls or an object mapping service url to a non-negative
+    integer weight.  A url with weight 0 is never selected, but every pool
+    needs at least one url with a positive weight.
+    """
+    try:
+        pools = json.loads(config)
+    except ValueError as e:
+        raise exceptions.InvalidServicePoolsError(
+                'Service pools are not valid JSON: %s' % e)
+
+    if not isinstance(pools, dict):
+        raise exceptions.InvalidServicePoolsError(
+                'Service pools must be a JSON object')
+
+    return {name: _validated_urls(name, urls)
+            for name, urls in pools.iteritems()}
+
+
+def _validated_urls(name, urls):
+    if isinstance(urls, list):
+        urls = {url: 1 for url in urls}
+    elif not isinstance(urls, dict):
+        raise exceptions.InvalidServicePoolsError(
+                'Service pool "%s" must be a list or an object' % name)
+
+    for url, weight in urls.iteritems():
+        if not _is_weight(weight):
+            raise exceptions.InvalidServicePoolsError(
+                    'Service pool "%s" has an invalid weight for "%s": %r'
+                    % (name, url, weight))
+
+    if not any(urls.itervalues()):
+        raise exceptions.InvalidServicePoolsError(
+                'Service pool "%s" has no url with a positive weight' % name)
+
+    return urls
+
+
+def _is_weight(weight):
+    return (isinstance(weight, (int, long)) and
+            not isinstance(weight, bool) and weight >= 0)
+
+
+def _load_strategy(strategy):
+    if strategy not in STRATEGIES:
+        raise exceptions.InvalidServicePoolsError(
+                'Unknown service url selection strategy "%s"' % strategy)
+    return strategy
+
+
+# Both are read when this module is imported, so a bad configuration stops
+# the service (or worker) from starting rather than failing requests.
+POOLS = load_pools(os.environ.get('PTERO_WORKFLOW_SERVICE_POOLS', '{}'))
+SELECTION_STRATEGY = _load_strategy(os.environ.get(
+    'PTERO_WORKFLOW_SERVICE_URL_SELECTION', LEAST_IN_FLIGHT))
+
+
+def get_pool(name):
+    try:
+        return weighted_urls(POOLS[name])
+    except KeyError:
+        raise exceptions.UnknownServicePoolError(
+                'Unknown service pool "%s"' % name)
+
+
+def weighted_urls(urls):
+    """
+    Return a dict of url -> positive weight for <urls>, a list of urls or a
+    dict of url -> weight.
+    """
+    if isinstance(urls, dict):
+        return {url: int(weight) for url, weight in urls.iteritems()
+                if weight > 0}
+    else:
+        return {url: 1 for url in urls}
+
+
+def select_service_url(weights, key, get_in_flight_counts,
+        strategy=None):
+    """
+    Pick one of the urls in <weights> (a dict of url -> positive weight).
+    <key> is a unique integer (the execution id) used for weighted
+    round-robin and <get_in_flight_counts> is only called when the
+    least-in-flight strategy is used.  <strategy> defaults to the configured
+    one.
+    """
+    if len(weights) == 1:
+        return weights.keys()[0]
+
+    if strategy is None:
+        strategy = SELECTION_STRATEGY
+
+    if strategy == WEIGHTED_ROUND_ROBIN:
+        return _weighted_round_robin(weights, key)
+    else:
+        return _least_in_flight(weights, get_in_flight_counts())
+
+
+def _weighted_round_robin(weights, key):
+    position = key % sum(weights.itervalues())
+    for url in sorted(weights):
+        position -= weights[url]
+        if position < 0:
+            return url
+
+
+def _least_in_flight(weights, in_flight_counts):
+    return min(sorted(weights),
+            key=lambda url: float(in_flight_counts.get(url, 0)) / weights[url])
@@ -0,0 +1,82 @@
+from collections import defaultdict
+from ptero_common.exceptions import NoSuchEntityError
+from ptero_workflow.implementation import models
+from ptero_workflow.urls import url_for
+from sqlalchemy import Integer, and_, cast, literal, null
+
+
+__all__ = ['SpawnedWorkflowTreeReport']
+
+
+class SpawnedWorkflowTreeReport(object):
+    """
+    Builds the tree of workflows spawned, directly or not, by the workflow's
+    executions.  The tree is walked by a recursive CTE, from each workflow to
+    the workflows whose parent execution belongs to it, and the status of
+    every workflow in it is read by the same query.  Workflows more than
+    <max_depth> levels below the workflow are left out.
+    """
+    def __init__(self, session, workflow_id, max_depth=None):
+        self.session = session
+        self.workflow_id = workflow_id
+        self.max_depth = max_depth
+
+    def _tree(self):
+        W = models.Workflow
+        E = models.Execution
+
+        tree = self.session.query(W.id.label('workflow_id'),
+                cast(null(), Integer).label('parent_workflow_id'),
+                cast(null(), Integer).label('parent_execution_id'),
+                literal(0).label('depth')
+                ).filter(W.id == self.workflow_id
+                ).cte('spawned_workflow_tree', recursive=True)
+
+        children = self.session.query(W.id, E.workflow_id,
+                W.parent_execution_id, tree.c.depth + 1
+                ).join(E, W.parent_execution_id == E.id
+                ).join(tree, E.workflow_id == tree.c.workflow_id)
+        if self.max_depth is not None:
+            children = children.filter(tree.c.depth < self.max_depth)
+
+        return tree.union_all(children)
+
+    def _nodes(self):
+        W = models.Workflow
+        M = models.Method
+        E = models.Execution
+
+        tree = self._tree()
+
+        # A workflow's status is that of its root task's DAG execution (see
+        # Workflow.status).
+        return self.session.query(tree.c.workflow_id,
+                tree.c.parent_workflow_id, tree.c.parent_execution_id,
+                W.name, E._status.label('status')
+                ).join(W, W.id == tree.c.workflow_id
+                ).outerjoin(M, and_(M.task_id == W.root_task_id, M.index == 0)
+                ).outerjoin(E, and_(E.method_id == M.id, E.color == W.color)
+                ).order_by(tree.c.depth, tree.c.workflow_id).all()
+
+    def as_dict(self):
+        nodes = self._nodes()
+        if not nodes:
+            raise NoSuchEntityError(
+                    "Workflow with id %s was not found." % self.workflow_id)
+
+        spawned_workflows = defaultdict(list)
+        for node in nodes:
+            result = {
+                'id': node.workflow_id,
+                'name': node.name,
+                'status': node.status,
+                'workflowUrl': url_for('workflow-detail',
+                    workflow_id=node.workflow_id),
+                'spawnedWorkflows': spawned_workflows[node.workflow_id],
+            }
+            if node.parent_execution_id is not None:
+                result['parentExecutionId'] = node.parent_execution_id
+            spawned_workflows[node.parent_workflow_id].append(result)
+
+        # the only node without a parent is the workflow itself
+        return spawned_workflows[None][0]
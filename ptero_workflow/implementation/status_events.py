@@ -0,0 +1,227 @@
+from collections import deque
+from itertools import groupby
+from ptero_common import nicer_logging
+from ptero_workflow.implementation import change_bus
+from ptero_workflow.implementation import models
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import os
+import threading
+
+
+LOG = nicer_logging.getLogger(__name__)
+
+__all__ = ['subscribe']
+
+
+# Each process watches a workflow's status updates once, however many
+# clients are streaming them, by fetching updates with change sequence
+# numbers above the last it has seen whenever the change bus announces an
+# execution change, or every POLL_INTERVAL seconds in case an announcement
+# was missed.  Updates are handed to the watchers in batches, one per change
+# sequence number, once their numbers are settled (see models.change_seq), so
+# an update can wait for the next poll behind an older transaction.  The web
+# processes run gunicorn's gevent workers (see the Procfile and api.wsgi),
+# which monkey patch threading, so the pollers and watchers are greenlets
+# and a worker can hold many streams open.
+POLL_INTERVAL = float(os.environ.get(
+    'PTERO_WORKFLOW_STATUS_EVENTS_POLL_INTERVAL', 10))
+KEEPALIVE_INTERVAL = float(os.environ.get(
+    'PTERO_WORKFLOW_STATUS_EVENTS_KEEPALIVE_INTERVAL', 15))
+
+# Watchers further behind than this many batches read from the database.
+BACKLOG = int(os.environ.get('PTERO_WORKFLOW_STATUS_EVENTS_BACKLOG', 1000))
+
+
+def _fetch_batches(session_factory, workflow_id, after_seq, until_seq=None):
+    H = models.ExecutionStatusHistory
+    session = session_factory()
+    try:
+        query = session.query(H.change_seq, H.execution_id, H.timestamp,
+                H.status).filter(H.workflow_id == workflow_id,
+                        H.change_seq > after_seq,
+                        H.change_seq < models.settled_change_seq_bound())
+        if until_seq is not None:
+            query = query.filter(H.change_seq <= until_seq)
+        rows = query.order_by(H.change_seq, H.id).all()
+    finally:
+        session.close()
+
+    return [(change_seq, [{
+                'executionId': execution_id,
+                'timestamp': str(timestamp),
+                'status': status,
+            } for _, execution_id, timestamp, status in batch])
+        for change_seq, batch in groupby(rows, lambda row: row[0])]
+
+
+def _get_settled_change_seq(session_factory):
+    session = session_factory()
+    try:
+        return session.query(models.settled_change_seq_bound()).scalar() - 1
+    finally:
+        session.close()
+
+
+class WorkflowFeed(object):
+    """
+    Polls for one workflow's status updates and keeps the latest batches
+    for its subscriptions.
+    """
+    def __init__(self, session_factory, workflow_id):
+        self.session_factory = session_factory
+        self.workflow_id = workflow_id
+        self.subscribers = 0
+
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._changed = threading.Event()
+        self._batches = deque()
+        self._thread = None
+
+        # every batch after covered_seq is in _batches
+        self.covered_seq = _get_settled_change_seq(session_factory)
+        self.last_seq = self.covered_seq
+
+    def start(self):
+        self._thread = threading.Thread(target=self._poll)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._changed.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._changed.set()
+
+    def _poll(self):
+        while True:
+            self._changed.wait(POLL_INTERVAL)
+            self._changed.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                batches = _fetch_batches(self.session_factory,
+                        self.workflow_id, self.last_seq)
+            except Exception:
+                LOG.exception('Failed to poll status updates of workflow %s',
+                        self.workflow_id)
+                continue
+            if batches:
+                self._add(batches)
+
+    def _add(self, batches):
+        with self._condition:
+            self._batches.extend(batches)
+            while len(self._batches) > BACKLOG:
+                self.covered_seq = self._batches.popleft()[0]
+            self.last_seq = batches[-1][0]
+            self._condition.notify_all()
+
+    def batches_after(self, change_seq, timeout):
+        """
+        Return the batches after <change_seq>, waiting up to <timeout> seconds
+        for one if there are none yet, and the change sequence number they
+        run up to.
+        """
+        with self._condition:
+            if change_seq >= self.covered_seq:
+                if self.last_seq <= change_seq:
+                    self._condition.wait(timeout)
+                return ([b for b in self._batches if b[0] > change_seq],
+                        max(change_seq, self.last_seq))
+            covered_seq = self.covered_seq
+
+        return _fetch_batches(self.session_factory, self.workflow_id,
+                change_seq, covered_seq), covered_seq
+
+
+class Subscription(object):
+    """
+    Iterates over (change_seq, updates) batches after <since_seq>, yielding
+    (None, None) when none arrived within KEEPALIVE_INTERVAL.
+    """
+    def __init__(self, hub, feed, since_seq):
+        self.hub = hub
+        self.feed = feed
+        self.change_seq = since_seq if since_seq is not None \
+                else feed.last_seq
+        self._closed = False
+
+    def __iter__(self):
+        while True:
+            batches, seen_seq = self.feed.batches_after(self.change_seq,
+                    KEEPALIVE_INTERVAL)
+            for batch in batches:
+                yield batch
+            if not batches and seen_seq == self.change_seq:
+                yield None, None
+            self.change_seq = seen_seq
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.hub.unsubscribe(self.feed)
+
+
+class StatusEventHub(object):
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def on_change(self, change):
+        if change['entity'] == 'execution':
+            with self._lock:
+                feed = self._feeds.get(change['workflowId'])
+            if feed is not None:
+                feed.wake()
+
+    def subscribe(self, workflow_id, since_seq=None):
+        with self._lock:
+            feed = self._feeds.get(workflow_id)
+            if feed is None:
+                feed = WorkflowFeed(self.session_factory, workflow_id)
+                feed.start()
+                self._feeds[workflow_id] = feed
+            feed.subscribers += 1
+        return Subscription(self, feed, since_seq)
+
+    def unsubscribe(self, feed):
+        with self._lock:
+            feed.subscribers -= 1
+            if feed.subscribers == 0:
+                feed.stop()
+                del self._feeds[feed.workflow_id]
+
+
+_HUB = None
+_HUB_PID = None
+_HUB_LOCK = threading.Lock()
+
+
+def _get_hub():
+    # A forked child (a gunicorn worker) gets a hub of its own, since the
+    # feeds' threads and the engine's connections do not survive a fork.
+    global _HUB, _HUB_PID
+    with _HUB_LOCK:
+        if _HUB is None or _HUB_PID != os.getpid():
+            engine = create_engine(os.environ['PTERO_WORKFLOW_DB_STRING'])
+            _HUB = StatusEventHub(sessionmaker(bind=engine))
+            _HUB_PID = os.getpid()
+            change_bus.subscribe(_HUB.on_change)
+        return _HUB
+
+
+def subscribe(workflow_id, since_seq=None):
+    """
+    Return a Subscription to the workflow's status updates after the change
+    sequence number <since_seq>, or after its latest change if that is None.
+    The subscription must be closed when the client goes away.
+    """
+    return _get_hub().subscribe(workflow_id, since_seq)
@@ -1,6 +1,7 @@
 from collections import defaultdict
 from ptero_common import nicer_logging
 from ptero_workflow.implementation import exceptions
+from ptero_workflow.implementation import service_pools
 from pprint import pformat
 
 LOG = nicer_logging.getLogger(__name__)
@@ -46,3 +47,8 @@ def required_inputs(workflow_data):
     if missing_inputs:
         raise exceptions.MissingInputsError("Missing required inputs: %s" %
                 ', '.join(sorted(missing_inputs)))
+
+
+def known_service_pool(pool_name):
+    # raises UnknownServicePoolError
+    service_pools.get_pool(pool_name)
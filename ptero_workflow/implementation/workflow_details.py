@@ -0,0 +1,110 @@
+from ptero_workflow.implementation import models
+from ptero_workflow.implementation.models import webhook
+from ptero_workflow.implementation.workflow_tree import WorkflowTree
+
+
+__all__ = ['WorkflowDetailsReport']
+
+
+_CONNECTOR_TYPES = ['InputConnector', 'OutputConnector']
+
+
+class WorkflowDetailsReport(object):
+    """
+    Builds the same report as Workflow.as_dict(detailed=True), but from a
+    WorkflowTree, which loads the workflow's tasks, methods, links, webhooks,
+    executions, status histories and child workflows with one query each,
+    instead of issuing queries per task, method, DAG and execution.
+    """
+    def __init__(self, session, workflow):
+        self.workflow = workflow
+        self.tree = WorkflowTree(session, workflow, executions=True)
+
+    def as_dict(self):
+        root_dag = self.tree.root_dag
+
+        result = {
+            'tasks': self._tasks_dict(root_dag),
+            'links': [l.as_dict() for l in sorted(self.tree.dag_links[root_dag.id],
+                key=lambda l: l.source_task.name + l.destination_task.name)],
+            'inputs': self.workflow.root_task.get_inputs(colors=[0],
+                begins=[0]),
+            'status': self._status(self.tree.method_executions[root_dag.id],
+                self.workflow.color),
+            'name': self.workflow.name,
+        }
+        webhooks = webhook.format_webhooks(self.tree.method_webhooks[root_dag.id])
+        if webhooks:
+            result['webhooks'] = webhooks
+
+        return result
+
+    def _tasks_dict(self, dag):
+        return {t.name: self._task_dict(t) for t in self.tree.task_children[dag.id]
+                if t.type not in _CONNECTOR_TYPES}
+
+    def _task_dict(self, task):
+        result = {
+            'methods': [self._method_dict(m)
+                for m in self.tree.task_methods[task.id]],
+        }
+        if task.parallel_by is not None:
+            result['parallelBy'] = task.parallel_by
+        webhooks = webhook.format_webhooks(self.tree.task_webhooks[task.id])
+        if webhooks:
+            result['webhooks'] = webhooks
+
+        result['executions'] = {e.color: self._execution_dict(e,
+                    '%s.%s' % (task.name, e.id))
+                for e in self.tree.task_executions[task.id]}
+        return result
+
+    def _method_dict(self, method):
+        result = {
+            'name': method.name,
+            'service': method.service,
+            'parameters': self._parameters(method),
+        }
+        webhooks = webhook.format_webhooks(self.tree.method_webhooks[method.id])
+        if webhooks:
+            result['webhooks'] = webhooks
+
+        result['executions'] = {e.color: self._execution_dict(e,
+                    '%s.%s.%s' % (method.task.name, method.name, e.id))
+                for e in self.tree.method_executions[method.id]}
+
+        if isinstance(method, models.Job):
+            method.add_service_url_to_dict(result)
+        return result
+
+    def _parameters(self, method):
+        if isinstance(method, models.DAG):
+            return {
+                'tasks': self._tasks_dict(method),
+                'links': [l.as_dict() for l in sorted(self.tree.dag_links[method.id],
+                    key=lambda l: (l.source_task.name,
+                        l.destination_task.name))],
+            }
+        else:
+            return method.get_parameters(detailed=True)
+
+    def _execution_dict(self, execution, name):
+        result = {
+            'name': name,
+            'color': execution.color,
+            'parent_color': execution.parent_color,
+            'data': execution.data,
+            'colors': execution.colors,
+            'begins': execution.begins,
+            'status': execution.status,
+            'status_history': self.tree.status_history[execution.id],
+        }
+        child_workflow_urls = self.tree.child_workflow_urls[execution.id]
+        if child_workflow_urls:
+            result['childWorkflowUrls'] = child_workflow_urls
+        return result
+
+    def _status(self, executions, color):
+        for execution in executions:
+            if execution.color == color:
+                return execution.status
@@ -0,0 +1,114 @@
+from collections import defaultdict
+from itertools import islice
+from ptero_workflow.implementation import models
+from ptero_workflow.urls import url_for
+from sqlalchemy import and_, exists, func
+import os
+
+
+__all__ = ['WorkflowExecutionsReport']
+
+
+BATCH_SIZE = int(os.environ.get('PTERO_WORKFLOW_REPORT_BATCH_SIZE', 1000))
+
+
+class WorkflowExecutionsReport(object):
+    """
+    Builds the executions of the workflow-executions report in change
+    sequence order, as Execution.as_dict_for_executions_report() would.
+    Executions are read through a server-side cursor <batch_size> at a time,
+    and the status histories and child workflows of each batch are read with
+    one query each, so only one batch is held in memory at once.
+    """
+    def __init__(self, session, workflow_id, since=None, since_seq=None,
+            batch_size=BATCH_SIZE):
+        self.session = session
+        self.workflow_id = workflow_id
+        self.since = since
+        self.since_seq = since_seq
+        self.batch_size = batch_size
+
+        # Executions changed after this are left for the next update, so the
+        # report is consistent however long it takes to send.  Changes that
+        # are not yet settled are left too, so that none are skipped.
+        self.change_seq = self._filter(self.session.query(
+            func.max(models.Execution.change_seq))).filter(
+                models.Execution.change_seq <
+                models.settled_change_seq_bound()).scalar()
+
+    def _filter(self, query):
+        E = models.Execution
+        query = query.filter(E.workflow_id == self.workflow_id)
+        if self.since_seq is not None:
+            query = query.filter(E.change_seq > self.since_seq)
+        elif self.since is not None:
+            # older clients poll with the timestamp of the last status update
+            H = models.ExecutionStatusHistory
+            query = query.filter(exists().where(and_(H.execution_id == E.id,
+                H.timestamp > self.since)))
+        return query
+
+    def executions(self):
+        if self.change_seq is None:
+            return
+
+        E = models.Execution
+        rows = iter(self._filter(self.session.query(E.id, E.task_id,
+                E.method_id, E.color, E.parent_color, E.colors, E.begins,
+                E._status.label('status'))
+            ).filter(E.change_seq <= self.change_seq
+            ).order_by(E.change_seq, E.id).yield_per(self.batch_size))
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            for execution in self._execution_dicts(batch):
+                yield execution
+
+    def _execution_dicts(self, batch):
+        execution_ids = [row.id for row in batch]
+        status_history = self._status_history(execution_ids)
+        child_workflow_urls = self._child_workflow_urls(execution_ids)
+
+        for row in batch:
+            result = {
+                'color': row.color,
+                'colors': row.colors,
+                'begins': row.begins,
+                'status': row.status,
+                'id': row.id,
+                'statusHistory': status_history[row.id],
+                'parentColor': row.parent_color,
+                'detailsUrl': url_for('execution-detail',
+                    execution_id=row.id),
+            }
+            if row.task_id is not None:
+                result['taskId'] = row.task_id
+            else:
+                result['methodId'] = row.method_id
+            if child_workflow_urls[row.id]:
+                result['childWorkflowUrls'] = child_workflow_urls[row.id]
+            yield result
+
+    def _status_history(self, execution_ids):
+        H = models.ExecutionStatusHistory
+        result = defaultdict(list)
+        for execution_id, timestamp, status in self.session.query(
+                H.execution_id, H.timestamp, H.status
+                ).filter(H.execution_id.in_(execution_ids)
+                ).order_by(H.timestamp, H.id):
+            result[execution_id].append(
+                    {'timestamp': str(timestamp), 'status': status})
+        return result
+
+    def _child_workflow_urls(self, execution_ids):
+        W = models.Workflow
+        result = defaultdict(list)
+        for workflow_id, execution_id in self.session.query(
+                W.id, W.parent_execution_id
+                ).filter(W.parent_execution_id.in_(execution_ids)
+                ).order_by(W.id):
+            result[execution_id].append(
+                    url_for('workflow-detail', workflow_id=workflow_id))
+        return result
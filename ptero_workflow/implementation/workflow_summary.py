@@ -0,0 +1,76 @@
+from collections import defaultdict
+from ptero_workflow.implementation import models
+from ptero_workflow.implementation.workflow_tree import WorkflowTree
+
+
+__all__ = ['WorkflowSummaryReport']
+
+
+_CONNECTOR_NAMES = ['input connector', 'output connector']
+
+
+class WorkflowSummaryReport(object):
+    """
+    Builds the same report as Workflow.as_dict_for_summary(), but reads the
+    workflow's execution status counts with a single query instead of
+    counting executions with one query per task and per method.
+    """
+    def __init__(self, session, workflow):
+        self.session = session
+        self.workflow = workflow
+        self.tree = WorkflowTree(session, workflow)
+
+        self._load_execution_summaries()
+
+    def _load_execution_summaries(self):
+        C = models.ExecutionStatusCount
+        self.task_summaries = defaultdict(dict)
+        self.method_summaries = defaultdict(dict)
+        for task_id, method_id, status, count in self.session.query(
+                C.task_id, C.method_id, C.status, C.count
+                ).filter(C.workflow_id == self.workflow.id, C.count > 0):
+            if method_id is not None:
+                self.method_summaries[method_id][status] = count
+            else:
+                self.task_summaries[task_id][status] = count
+
+    def as_dict(self):
+        root_dag = self.tree.root_dag
+        return {
+            'tasks': self._tasks_list(root_dag),
+            'status': self._status(root_dag),
+            'name': self.workflow.name,
+        }
+
+    def _tasks_list(self, dag):
+        sorted_tasks = sorted(self.tree.task_children[dag.id],
+                key=lambda x: x.topological_index)
+        return [self._task_dict(t) for t in sorted_tasks
+                if t.name not in _CONNECTOR_NAMES]
+
+    def _task_dict(self, task):
+        result = {
+            'executionSummary': self.task_summaries[task.id],
+            'name': task.name,
+            'methods': [self._method_dict(m)
+                for m in self.tree.task_methods[task.id]],
+        }
+        if task.parallel_by is not None:
+            result['parallelBy'] = task.parallel_by
+        return result
+
+    def _method_dict(self, method):
+        result = {
+            'executionSummary': self.method_summaries[method.id],
+            'name': method.name,
+            'service': method.service,
+        }
+        if isinstance(method, models.DAG):
+            result['parameters'] = {'tasks': self._tasks_list(method)}
+        return result
+
+    def _status(self, root_dag):
+        E = models.Execution
+        return self.session.query(E._status).filter(
+                E.method_id == root_dag.id,
+                E.color == self.workflow.color).scalar()
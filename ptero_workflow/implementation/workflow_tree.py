@@ -0,0 +1,146 @@
+from collections import defaultdict
+from ptero_workflow.implementation import models
+from ptero_workflow.urls import url_for
+from sqlalchemy import or_
+from sqlalchemy.orm import with_polymorphic
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+__all__ = ['WorkflowTree']
+
+
+class WorkflowTree(object):
+    """
+    Loads a workflow's tasks, methods, links and webhooks, and optionally its
+    executions, with one query each.  Every task and method carries its
+    workflow_id, so the tasks of nested DAGs are loaded by the same queries.
+
+    The loaded objects are grouped by parent (task_children, task_methods,
+    dag_links, task_webhooks and method_webhooks), and their relationships
+    (DAG.children, MethodList.method_list, Task.input_links, webhooks, ...)
+    are populated from them, so that traversing the workflow afterwards, as
+    the reports and Workflow.build_petri_net do, issues no further queries.
+    """
+    def __init__(self, session, workflow, executions=False):
+        self.session = session
+        self.workflow = workflow
+
+        self._load_tasks_and_methods()
+        self._load_links()
+        self._load_webhooks()
+        if executions:
+            self._load_executions()
+
+    @property
+    def root_dag(self):
+        return self.task_methods[self.workflow.root_task_id][0]
+
+    def _load_tasks_and_methods(self):
+        m = models
+        tasks = self.session.query(with_polymorphic(m.Task, '*')
+                ).filter_by(workflow_id=self.workflow.id).all()
+
+        self.task_children = defaultdict(list)
+        for task in tasks:
+            self.task_children[task.parent_id].append(task)
+
+        methods = self.session.query(with_polymorphic(m.Method, '*')
+                ).filter_by(workflow_id=self.workflow.id
+                ).order_by(m.Method.index).all()
+
+        self.task_methods = defaultdict(list)
+        for method in methods:
+            self.task_methods[method.task_id].append(method)
+
+        for task in tasks:
+            if isinstance(task, m.MethodList):
+                task_methods = self.task_methods[task.id]
+                set_committed_value(task, 'method_list', task_methods)
+                set_committed_value(task, 'methods', task_methods)
+        for method in methods:
+            if isinstance(method, m.DAG):
+                children = self.task_children[method.id]
+                set_committed_value(method, 'child_list', children)
+                set_committed_value(method, 'children', children)
+
+    def _load_links(self):
+        m = models
+        # Tasks are already loaded, so the link's source_task and
+        # destination_task are found without further queries.
+        links = self.session.query(m.Link).join(m.Task,
+                m.Link.destination_id == m.Task.id
+                ).filter(m.Task.workflow_id == self.workflow.id
+                ).order_by(m.Link.id).all()
+
+        self.dag_links = defaultdict(list)
+        input_links = defaultdict(list)
+        output_links = defaultdict(list)
+        for link in links:
+            self.dag_links[link.destination_task.parent_id].append(link)
+            input_links[link.destination_id].append(link)
+            output_links[link.source_id].append(link)
+
+        for tasks in self.task_children.itervalues():
+            for task in tasks:
+                set_committed_value(task, 'input_links', input_links[task.id])
+                set_committed_value(task, 'output_links',
+                        output_links[task.id])
+
+    def _load_webhooks(self):
+        m = models
+        webhooks = self.session.query(m.Webhook
+                ).outerjoin(m.Task, m.Webhook.task_id == m.Task.id
+                ).outerjoin(m.Method, m.Webhook.method_id == m.Method.id
+                ).filter(or_(m.Task.workflow_id == self.workflow.id,
+                    m.Method.workflow_id == self.workflow.id)
+                ).order_by(m.Webhook.id).all()
+
+        self.task_webhooks = defaultdict(list)
+        self.method_webhooks = defaultdict(list)
+        for w in webhooks:
+            if w.method_id is not None:
+                self.method_webhooks[w.method_id].append(w)
+            else:
+                self.task_webhooks[w.task_id].append(w)
+
+        for tasks in self.task_children.itervalues():
+            for task in tasks:
+                set_committed_value(task, 'webhooks',
+                        self.task_webhooks[task.id])
+        for methods in self.task_methods.itervalues():
+            for method in methods:
+                set_committed_value(method, 'webhooks',
+                        self.method_webhooks[method.id])
+
+    def _load_executions(self):
+        m = models
+        E = m.Execution
+        H = m.ExecutionStatusHistory
+
+        self.status_history = defaultdict(list)
+        for execution_id, timestamp, status in self.session.query(
+                H.execution_id, H.timestamp, H.status
+                ).filter(H.workflow_id == self.workflow.id
+                ).order_by(H.timestamp, H.id):
+            self.status_history[execution_id].append(
+                    {'timestamp': str(timestamp), 'status': status})
+
+        self.child_workflow_urls = defaultdict(list)
+        for workflow_id, execution_id in self.session.query(
+                m.Workflow.id, m.Workflow.parent_execution_id
+                ).join(E, m.Workflow.parent_execution_id == E.id
+                ).filter(E.workflow_id == self.workflow.id
+                ).order_by(m.Workflow.id):
+            self.child_workflow_urls[execution_id].append(
+                    url_for('workflow-detail', workflow_id=workflow_id))
+
+        self.task_executions = defaultdict(list)
+        self.method_executions = defaultdict(list)
+        for row in self.session.query(E.id, E.task_id, E.method_id, E.color,
+                E.parent_color, E.data, E.colors, E.begins,
+                E._status.label('status')
+                ).filter(E.workflow_id == self.workflow.id):
+            if row.method_id is not None:
+                self.method_executions[row.method_id].append(row)
+            else:
+                self.task_executions[row.task_id].append(row)
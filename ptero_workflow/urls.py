@@ -14,6 +14,10 @@ ENDPOINT_INFO = {
             'url': '/workflows/<int:workflow_id>',
             'format': '/workflows/%(workflow_id)d',
         },
+        'workflow-status-events': {
+            'url': '/workflows/<int:workflow_id>/status-events',
+            'format': '/workflows/%(workflow_id)d/status-events',
+        },
         'execution-detail': {
             'url': '/executions/<int:execution_id>',
             'format': '/executions/%(execution_id)d',
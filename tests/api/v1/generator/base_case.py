@@ -11,6 +11,11 @@ import logging
 import difflib
 import re
 import time
+from ptero_workflow.implementation.factory import Factory
+from ptero_workflow.implementation.workflow_details import (
+        WorkflowDetailsReport)
+from ptero_workflow.implementation.workflow_summary import (
+        WorkflowSummaryReport)
 from tests import util
 
 
@@ -107,6 +112,8 @@ class TestCaseMixin(object):
         if self._expected_executions is not None:
             self._verify_workflow_executions(url)
 
+        self._verify_report_builders(workflow_url)
+
         self._delete(workflow_url)
 
     def _delete(self, workflow_url):
@@ -174,6 +181,29 @@ class TestCaseMixin(object):
         self.assertEqual(len(expected_result['executions']),
                 len(actual_result['executions']))
 
+    def _verify_report_builders(self, workflow_url):
+        # the reports are built from bulk-loaded rows, but must match what
+        # the models build by walking the workflow
+        backend = Factory(os.environ['PTERO_WORKFLOW_DB_STRING']
+                ).create_backend()
+        try:
+            workflow_id = int(workflow_url.rstrip('/').rsplit('/', 1)[1])
+            workflow = backend._get_workflow(workflow_id)
+
+            self.assertEqual(
+                    self._as_json(workflow.as_dict(detailed=True)),
+                    self._as_json(WorkflowDetailsReport(backend.session,
+                        workflow).as_dict()))
+            self.assertEqual(
+                    self._as_json(workflow.as_dict_for_summary()),
+                    self._as_json(WorkflowSummaryReport(backend.session,
+                        workflow).as_dict()))
+        finally:
+            backend.cleanup()
+
+    def _as_json(self, data):
+        return json.loads(self._to_json(data))
+
     def _to_json(self, data):
         return json.dumps( data, indent=4, sort_keys=True, default=str )
 
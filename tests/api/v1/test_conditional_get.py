@@ -0,0 +1,133 @@
+from ..base import BaseAPITest
+from sqlalchemy import create_engine
+import os
+import requests
+import time
+
+
+class TestConditionalGet(BaseAPITest):
+    post_data = {
+        'tasks': {},
+        'links': [
+            {
+                'source': 'input connector',
+                'destination': 'output connector',
+                'dataFlow': {
+                    'in_a': 'out_a',
+                },
+            },
+        ],
+        'inputs': {
+            'in_a': 'kittens',
+        },
+    }
+
+    def setUp(self):
+        super(TestConditionalGet, self).setUp()
+        response = self.post(self.post_url, self.post_data)
+        self.assertEqual(201, response.status_code)
+        self.workflow_url = response.headers['Location']
+        self.wait_for_completion(self.workflow_url)
+
+    def tearDown(self):
+        self.delete(self.workflow_url)
+
+    def wait_for_completion(self, workflow_url):
+        # the workflow must stop changing for its ETags to be stable
+        status_url = self.get(workflow_url).DATA['reports']['workflow-status']
+        for _ in xrange(self._timeout * 10):
+            if self.get(status_url).DATA['status'] == 'succeeded':
+                return
+            time.sleep(0.1)
+        self.fail('Workflow %s did not succeed' % workflow_url)
+
+    @property
+    def _timeout(self):
+        return 25
+
+    def assert_conditional_get(self, url):
+        response = requests.get(url)
+        self.assertEqual(200, response.status_code)
+        etag = response.headers['ETag']
+
+        response = requests.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response.headers['ETag'])
+        self.assertEqual('', response.text)
+
+        response = requests.get(url, headers={'If-None-Match': '"stale"'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(etag, response.headers['ETag'])
+
+    def test_workflow(self):
+        self.assert_conditional_get(self.workflow_url)
+
+    def test_reports(self):
+        reports = self.get(self.workflow_url).DATA['reports']
+        for report_type in ['workflow-status', 'workflow-summary',
+                'workflow-skeleton']:
+            self.assert_conditional_get(reports[report_type])
+
+    def test_executions_report_is_not_versioned(self):
+        reports = self.get(self.workflow_url).DATA['reports']
+        response = requests.get(reports['workflow-executions'])
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_executions_report_includes_held_back_changes_once_settled(self):
+        engine = create_engine(os.environ['PTERO_WORKFLOW_DB_STRING'])
+        connection = engine.connect()
+        transaction = connection.begin()
+        try:
+            # an older transaction that is still running holds back the
+            # changes of every transaction that started after it
+            connection.execute('SELECT txid_current()')
+
+            response = self.post(self.post_url, self.post_data)
+            self.assertEqual(201, response.status_code)
+            workflow_url = response.headers['Location']
+            self.addCleanup(self.delete, workflow_url)
+            self.wait_for_completion(workflow_url)
+
+            executions_url = self.get(workflow_url).DATA['reports'][
+                    'workflow-executions']
+            held_back = self.get(executions_url)
+            self.assertEqual(200, held_back.status_code)
+            self.assertEqual([], held_back.DATA['executions'])
+            self.assertNotIn('ETag', held_back.headers)
+        finally:
+            transaction.rollback()
+            connection.close()
+
+        settled = self.get(executions_url)
+        self.assertEqual(200, settled.status_code)
+        self.assertNotEqual([], settled.DATA['executions'])
+
+    def test_spawned_workflows_report_is_not_versioned(self):
+        reports = self.get(self.workflow_url).DATA['reports']
+        response = requests.get(reports['spawned-workflows'])
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_spawned_workflow_tree_report_is_not_versioned(self):
+        reports = self.get(self.workflow_url).DATA['reports']
+        response = requests.get(reports['spawned-workflow-tree'])
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('ETag', response.headers)
+
+        tree = response.json()['spawnedWorkflowTree']
+        self.assertEqual(self.workflow_url, tree['workflowUrl'])
+        self.assertEqual('succeeded', tree['status'])
+        self.assertEqual([], tree['spawnedWorkflows'])
+
+    def test_finished_workflow_reports_are_cached(self):
+        reports = self.get(self.workflow_url).DATA['reports']
+        for report_type in ['workflow-details', 'workflow-outputs',
+                'workflow-skeleton', 'workflow-summary']:
+            rendered = requests.get(reports[report_type])
+            cached = requests.get(reports[report_type])
+            self.assertEqual(200, cached.status_code)
+            self.assertEqual('application/json',
+                    cached.headers['Content-Type'])
+            self.assertEqual(rendered.headers['ETag'], cached.headers['ETag'])
+            self.assertEqual(rendered.text, cached.text)
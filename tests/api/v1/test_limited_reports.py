@@ -0,0 +1,113 @@
+from ..base import BaseAPITest
+from sqlalchemy import create_engine, text
+import os
+import time
+import urlparse
+
+
+class TestLimitedReports(BaseAPITest):
+    post_data = {
+        'tasks': {},
+        'links': [
+            {
+                'source': 'input connector',
+                'destination': 'output connector',
+                'dataFlow': {
+                    'in_a': 'out_a',
+                },
+            },
+        ],
+        'inputs': {
+            'in_a': 'kittens',
+        },
+    }
+
+    report_types = {
+        'limited-workflow-executions': 'executions',
+        'limited-workflow-status-updates': 'statusUpdates',
+    }
+
+    def setUp(self):
+        super(TestLimitedReports, self).setUp()
+        response = self.post(self.post_url, self.post_data)
+        self.assertEqual(201, response.status_code)
+        self.workflow_url = response.headers['Location']
+        self.reports = response.DATA['reports']
+        self.wait_for_completion()
+        self.share_one_timestamp()
+
+    def tearDown(self):
+        self.delete(self.workflow_url)
+
+    def wait_for_completion(self):
+        status_url = self.reports['workflow-status']
+        for _ in xrange(self._timeout * 10):
+            if self.get(status_url).DATA['status'] == 'succeeded':
+                return
+            time.sleep(0.1)
+        self.fail('Workflow %s did not succeed' % self.workflow_url)
+
+    @property
+    def _timeout(self):
+        return 25
+
+    def share_one_timestamp(self):
+        # rows written in one transaction share its timestamp; make every
+        # row of the workflow do so, so that pages must be told apart by id
+        workflow_id = int(self.workflow_url.rsplit('/', 1)[1])
+        engine = create_engine(os.environ['PTERO_WORKFLOW_DB_STRING'])
+        with engine.begin() as connection:
+            for table in ['execution', 'execution_status_history']:
+                connection.execute(text('UPDATE %s SET timestamp = '
+                    "'2016-01-01 00:00:00.5+00' WHERE workflow_id = :id"
+                    % table), id=workflow_id)
+
+    def get_report(self, report_type, **kwargs):
+        response = self.get(self.reports[report_type], **kwargs)
+        self.assertEqual(200, response.status_code)
+        return response.DATA
+
+    def follow(self, update_url):
+        response = self.get(update_url)
+        self.assertEqual(200, response.status_code)
+        return response.DATA
+
+    def test_pages_neither_repeat_nor_skip_rows(self):
+        for report_type, key in self.report_types.iteritems():
+            everything = self.get_report(report_type, limit=1000)[key]
+            self.assertGreater(len(everything), 1)
+
+            for limit in [1, 2]:
+                pages = []
+                report = self.get_report(report_type, limit=limit)
+                while True:
+                    pages.extend(report[key])
+                    if not report['hasMore']:
+                        break
+                    report = self.follow(report['updateUrl'])
+                self.assertEqual(everything, pages)
+
+    def test_bare_since_includes_rows_at_that_timestamp(self):
+        for report_type, key in self.report_types.iteritems():
+            report = self.get_report(report_type, limit=1)
+            query = urlparse.parse_qs(urlparse.urlparse(
+                report['updateUrl']).query)
+            everything = self.get_report(report_type, limit=1000)[key]
+
+            since_only = self.get_report(report_type, limit=1000,
+                    since=query['since'][0])
+            self.assertEqual(everything, since_only[key])
+
+    def test_remaining_rows_are_only_counted_on_request(self):
+        for report_type, key in self.report_types.iteritems():
+            total = len(self.get_report(report_type, limit=1000)[key])
+
+            report = self.get_report(report_type, limit=1)
+            self.assertNotIn('numRemaining', report)
+
+            report = self.get_report(report_type, limit=1, count_remaining=1)
+            self.assertEqual(total - 1, report['numRemaining'])
+            self.assertTrue(report['hasMore'])
+
+            report = self.follow(report['updateUrl'])
+            self.assertEqual(total - 2, report['numRemaining'])
@@ -403,3 +403,46 @@ class MissingInputs(PostWorkflowFailure, BaseAPITest):
                     'in_b': 'kittens',
                     },
                 }
+
+
+class UnknownServicePool(PostWorkflowFailure, BaseAPITest):
+    expected_error_message = 'Unknown service pool "no-such-pool"'
+
+    @property
+    def post_data(self):
+        return {
+                'tasks': {
+                    'A': {
+                        'methods': [
+                            {
+                                'name': 'execute',
+                                'service': 'job',
+                                'servicePool': 'no-such-pool',
+                                'parameters': {
+                                    'commandLine': ['cat'],
+                                    'user': 'testuser',
+                                    'workingDirectory': '/test/working/directory'
+                                    }
+                                }
+                            ]
+                        },
+                    },
+                'links': [
+                    {
+                        'source': 'input connector',
+                        'destination': 'A',
+                        'dataFlow': {
+                            'in_a': 'param'
+                            }
+                        }, {
+                            'source': 'A',
+                            'destination': 'output connector',
+                            'dataFlow': {
+                                'result': 'out_a'
+                                }
+                            },
+                        ],
+                'inputs': {
+                    'in_a': 'kittens',
+                    },
+                }
@@ -0,0 +1,76 @@
+import unittest
+from ptero_workflow.implementation import change_bus
+from sqlalchemy import create_engine
+import os
+import threading
+
+
+class TestChangeBus(unittest.TestCase):
+    def setUp(self):
+        db_string = os.environ['PTERO_WORKFLOW_DB_STRING']
+        self.engine = create_engine(db_string)
+
+        self.changes = []
+        self.received = threading.Event()
+        self.listener = change_bus.ChangeListener(db_string, timeout=0.1)
+        self.listener.subscribe(self.receive)
+        self.listener.start()
+        self.assertTrue(self.listener.wait_until_listening(5))
+
+    def tearDown(self):
+        self.listener.stop()
+
+    def receive(self, change):
+        self.changes.append(change)
+        self.received.set()
+
+    def test_delivers_committed_changes(self):
+        with self.engine.begin() as connection:
+            change_bus.notify(connection, 1, 'execution', 2, 3)
+
+        self.assertTrue(self.received.wait(5))
+        self.assertEqual(self.changes, [
+            {'workflowId': 1, 'entity': 'execution', 'id': 2, 'seq': 3}])
+
+    def test_delivers_each_of_many_changes(self):
+        with self.engine.begin() as connection:
+            change_bus.notify_many(connection, [(1, 'execution', 2, 3),
+                (1, 'execution', 4, 3), (5, 'result', 6, 7)])
+
+        for _ in xrange(50):
+            if len(self.changes) == 3:
+                break
+            self.received.wait(0.1)
+        self.assertEqual(self.changes, [
+            {'workflowId': 1, 'entity': 'execution', 'id': 2, 'seq': 3},
+            {'workflowId': 1, 'entity': 'execution', 'id': 4, 'seq': 3},
+            {'workflowId': 5, 'entity': 'result', 'id': 6, 'seq': 7}])
+
+    def test_ignores_rolled_back_changes(self):
+        connection = self.engine.connect()
+        transaction = connection.begin()
+        change_bus.notify(connection, 1, 'execution', 2, 3)
+        transaction.rollback()
+        connection.close()
+
+        with self.engine.begin() as connection:
+            change_bus.notify(connection, 4, 'workflow', 4, 5)
+
+        self.assertTrue(self.received.wait(5))
+        self.assertEqual(self.changes, [
+            {'workflowId': 4, 'entity': 'workflow', 'id': 4, 'seq': 5}])
+
+    def test_consumer_failures_do_not_stop_delivery(self):
+        def fail(change):
+            raise RuntimeError('consumer failed')
+        self.listener.subscribe(fail)
+
+        for entity_id in [1, 2]:
+            with self.engine.begin() as connection:
+                change_bus.notify(connection, 1, 'result', entity_id, None)
+
+        for _ in xrange(50):
+            if len(self.changes) == 2:
+                break
+            self.received.wait(0.1)
+        self.assertEqual([c['id'] for c in self.changes], [1, 2])
@@ -0,0 +1,74 @@
+from ptero_workflow.api import compression
+from ptero_workflow.api.v1 import representations
+import flask
+import json
+import unittest
+import zlib
+
+
+def _executions(count):
+    for i in xrange(count):
+        yield {'id': i, 'detailsUrl': 'http://example.com/v1/executions/%s' % i}
+
+
+def _report(count):
+    return {'executions': list(_executions(count))}
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        app = flask.Flask('test')
+        app.after_request(compression.compress_response)
+
+        @app.route('/streamed/<int:count>')
+        def streamed(count):
+            return self.json_response(representations.StreamedJSON({
+                'executions': representations.JSONStream(_executions(count))
+            }))
+
+        @app.route('/rendered/<int:count>')
+        def rendered(count):
+            return self.json_response(representations.RenderedJSON(
+                representations.render_json(_report(count))))
+
+        @app.route('/gzipped')
+        def gzipped():
+            return self.json_response(representations.RenderedJSON(
+                compression._compress(
+                    representations.render_json(_report(1)), 'gzip'),
+                gzipped=True))
+
+        self.client = app.test_client()
+
+    def json_response(self, data):
+        response = representations.output_json(data, 200)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+    def get(self, url, accept_encoding):
+        response = self.client.get(url,
+                headers={'Accept-Encoding': accept_encoding})
+        encoding = response.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            data = zlib.decompress(response.data, zlib.MAX_WBITS | 16)
+        elif encoding == 'deflate':
+            data = zlib.decompress(response.data)
+        else:
+            data = response.data
+        self.assertEqual('Accept-Encoding', response.headers['Vary'])
+        return encoding, json.loads(data)
+
+    def test_large_responses_are_compressed(self):
+        for url in ['/streamed/1000', '/rendered/1000']:
+            self.assertEqual(('gzip', _report(1000)), self.get(url, 'gzip'))
+            self.assertEqual(('deflate', _report(1000)),
+                    self.get(url, 'deflate'))
+            self.assertEqual((None, _report(1000)), self.get(url, ''))
+
+    def test_small_responses_are_not_compressed(self):
+        for url in ['/streamed/1', '/rendered/1']:
+            self.assertEqual((None, _report(1)), self.get(url, 'gzip'))
+
+    def test_gzipped_bodies_are_sent_as_they_are(self):
+        self.assertEqual(('gzip', _report(1)), self.get('/gzipped', 'gzip'))
+        self.assertEqual((None, _report(1)), self.get('/gzipped', 'deflate'))
@@ -0,0 +1,20 @@
+import unittest
+from ptero_workflow.implementation.models import packed_array
+
+
+class TestPackedArray(unittest.TestCase):
+    def test_packed_types(self):
+        self.assertEqual(packed_array.get_packed_type([1, 2L, -3]), 'q')
+        self.assertEqual(packed_array.get_packed_type([1.5, -2.0]), 'd')
+
+    def test_unpackable_data(self):
+        for data in [[], [1, 2.0], [True, False], [2 ** 63], ['a'], {},
+                [[1]], 1]:
+            self.assertIsNone(packed_array.get_packed_type(data))
+
+    def test_round_trip(self):
+        for data in [[1, -2, 2 ** 63 - 1, -2 ** 63], [0.1, -1e300, 2.5]]:
+            packed_type = packed_array.get_packed_type(data)
+            packed = packed_array.pack(data, packed_type)
+            self.assertEqual(len(packed), len(data) * packed_array.ITEM_SIZE)
+            self.assertEqual(packed_array.unpack(packed, packed_type), data)
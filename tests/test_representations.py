@@ -0,0 +1,49 @@
+from ptero_workflow.api.v1 import representations
+import json
+import unittest
+
+
+def _executions(count):
+    for i in xrange(count):
+        yield {'id': i, 'statusHistory': [{'status': 'new\nline'}]}
+
+
+class TestIterJSON(unittest.TestCase):
+    def data(self, count):
+        return {
+            'updateUrl': 'http://example.com/report',
+            'executions': representations.JSONStream(_executions(count)),
+        }
+
+    def expected(self, count):
+        return {
+            'updateUrl': 'http://example.com/report',
+            'executions': list(_executions(count)),
+        }
+
+    def test_compact(self):
+        for count in [0, 1, 3]:
+            body = representations.render_json(self.data(count))
+            self.assertEqual(self.expected(count), json.loads(body))
+            self.assertNotIn('\n', body.rstrip('\n'))
+
+    def test_pretty_matches_json_dumps(self):
+        for count in [0, 1, 3]:
+            body = representations.render_json(self.data(count), pretty=True)
+            self.assertEqual(json.dumps(self.expected(count), indent=4,
+                sort_keys=True, separators=(',', ': ')) + '\n', body)
+
+    def test_streams_are_consumed_lazily(self):
+        consumed = []
+
+        def executions():
+            for execution in _executions(2):
+                consumed.append(execution['id'])
+                yield execution
+
+        chunks = representations.iter_json(
+                {'executions': representations.JSONStream(executions())})
+        self.assertEqual('{', next(chunks))
+        self.assertEqual([], consumed)
+        ''.join(chunks)
+        self.assertEqual([0, 1], consumed)
@@ -0,0 +1,60 @@
+import unittest
+from ptero_workflow.implementation.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    def test_returns_copies_of_cached_values(self):
+        cache = ResultCache(100)
+        cache.put((1, 'a'), {'x': [1, 2]})
+
+        found, value = cache.get((1, 'a'))
+        self.assertTrue(found)
+        value['x'].append(3)
+        self.assertEqual(cache.get((1, 'a')), (True, {'x': [1, 2]}))
+
+    def test_caches_null_values(self):
+        cache = ResultCache(100)
+        cache.put((1, 'a'), None)
+        self.assertEqual(cache.get((1, 'a')), (True, None))
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(10)
+        cache.put((1, 'a'), 'xxx')
+        cache.put((1, 'b'), 'yyy')
+        cache.get((1, 'a'))
+        cache.put((1, 'c'), 'zzz')
+
+        self.assertEqual(cache.get((1, 'b')), (False, None))
+        self.assertEqual(cache.get((1, 'a')), (True, 'xxx'))
+        self.assertEqual(cache.stats()['bytes'], 10)
+
+    def test_ignores_values_larger_than_the_cache(self):
+        cache = ResultCache(4)
+        cache.put((1, 'a'), 'xxxx')
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_invalidate_workflow(self):
+        cache = ResultCache(100)
+        cache.put((1, 'a'), 1)
+        cache.put((2, 'a'), 2)
+        cache.invalidate_workflow(1)
+
+        self.assertEqual(cache.get((1, 'a')), (False, None))
+        self.assertEqual(cache.get((2, 'a')), (True, 2))
+        self.assertEqual(cache.stats()['bytes'], 1)
+
+    def test_counts_hits_and_misses(self):
+        cache = ResultCache(100)
+        cache.put((1, 'a'), 1)
+        cache.get((1, 'a'))
+        cache.get((1, 'b'))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_size_zero_disables_cache(self):
+        cache = ResultCache(0)
+        cache.put((1, 'a'), 'x')
+        self.assertEqual(cache.get((1, 'a')), (False, None))
+        self.assertEqual(cache.stats()['misses'], 0)
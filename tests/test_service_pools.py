@@ -0,0 +1,72 @@
+import unittest
+from ptero_workflow.implementation import exceptions
+from ptero_workflow.implementation import service_pools
+
+
+class TestLoadPools(unittest.TestCase):
+    def test_lists_and_weights(self):
+        pools = service_pools.load_pools(
+                '{"a": ["http://x", "http://y"], "b": {"http://z": 3}}')
+        self.assertEqual(pools, {
+            'a': {'http://x': 1, 'http://y': 1},
+            'b': {'http://z': 3},
+        })
+
+    def test_invalid_configurations(self):
+        for config in ['{', '[]', '{"a": "http://x"}',
+                '{"a": {"http://x": -1}}', '{"a": {"http://x": 1.5}}',
+                '{"a": {"http://x": 0}}', '{"a": []}']:
+            with self.assertRaises(exceptions.InvalidServicePoolsError):
+                service_pools.load_pools(config)
+
+
+class TestWeightedUrls(unittest.TestCase):
+    def test_zero_weights_are_dropped(self):
+        self.assertEqual(service_pools.weighted_urls(
+            {'http://x': 0, 'http://y': 2}), {'http://y': 2})
+
+
+class TestSelectServiceUrl(unittest.TestCase):
+    def test_single_url(self):
+        def fail():
+            self.fail('in-flight counts should not be needed')
+        self.assertEqual(service_pools.select_service_url(
+            {'http://x': 1}, 7, fail), 'http://x')
+
+    def test_weighted_round_robin_strategy(self):
+        weights = {'http://x': 1, 'http://y': 1}
+        self.assertEqual([service_pools.select_service_url(weights, key,
+                None, strategy=service_pools.WEIGHTED_ROUND_ROBIN)
+            for key in range(4)],
+            ['http://x', 'http://y', 'http://x', 'http://y'])
+
+    def test_least_in_flight_strategy(self):
+        weights = {'http://x': 1, 'http://y': 1}
+        self.assertEqual(service_pools.select_service_url(weights, 0,
+            lambda: {'http://x': 3, 'http://y': 1},
+            strategy=service_pools.LEAST_IN_FLIGHT), 'http://y')
+
+
+class TestWeightedRoundRobin(unittest.TestCase):
+    def test_follows_weights(self):
+        weights = {'http://x': 2, 'http://y': 1}
+        self.assertEqual([service_pools._weighted_round_robin(weights, key)
+            for key in range(6)],
+            ['http://x', 'http://x', 'http://y'] * 2)
+
+
+class TestLeastInFlight(unittest.TestCase):
+    def test_counts_are_scaled_by_weight(self):
+        weights = {'http://x': 4, 'http://y': 1}
+        self.assertEqual(service_pools._least_in_flight(weights,
+            {'http://x': 3, 'http://y': 1}), 'http://x')
+
+    def test_urls_without_executions_count_as_idle(self):
+        weights = {'http://x': 1, 'http://y': 1}
+        self.assertEqual(service_pools._least_in_flight(weights,
+            {'http://x': 1}), 'http://y')
+
+    def test_ties_go_to_the_first_url(self):
+        weights = {'http://y': 1, 'http://x': 1}
+        self.assertEqual(service_pools._least_in_flight(weights, {}),
+                'http://x')
@@ -0,0 +1,93 @@
+import os
+import unittest
+from ptero_workflow.implementation import status_events
+
+
+def _batch(change_seq):
+    return (change_seq, [{'executionId': change_seq, 'status': 'running'}])
+
+
+class TestStatusEvents(unittest.TestCase):
+    def setUp(self):
+        self.stored = [_batch(2), _batch(5), _batch(7)]
+        self.fetch_batches = status_events._fetch_batches
+        self.get_settled_change_seq = status_events._get_settled_change_seq
+
+        def fetch_batches(session_factory, workflow_id, after_seq,
+                until_seq=None):
+            return [b for b in self.stored if after_seq < b[0]
+                    and (until_seq is None or b[0] <= until_seq)]
+        status_events._fetch_batches = fetch_batches
+        status_events._get_settled_change_seq = lambda *args: 7
+
+        self.hub = status_events.StatusEventHub(session_factory=None)
+        self.subscriptions = []
+
+    def tearDown(self):
+        # the feeds' threads must be gone before the fakes are replaced
+        for subscription in self.subscriptions:
+            subscription.close()
+        for subscription in self.subscriptions:
+            subscription.feed.join()
+
+        status_events._fetch_batches = self.fetch_batches
+        status_events._get_settled_change_seq = self.get_settled_change_seq
+
+    def subscribe(self, since_seq=None):
+        subscription = self.hub.subscribe(1, since_seq=since_seq)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def test_new_subscribers_get_live_batches(self):
+        subscription = self.subscribe()
+        feed = subscription.feed
+        feed._add([_batch(9), _batch(10)])
+
+        events = iter(subscription)
+        self.assertEqual([next(events), next(events)], [_batch(9), _batch(10)])
+        subscription.close()
+
+    def test_resuming_subscribers_catch_up_from_the_database(self):
+        subscription = self.subscribe(since_seq=2)
+        subscription.feed._add([_batch(9)])
+
+        events = iter(subscription)
+        self.assertEqual([next(events), next(events), next(events)],
+                [_batch(5), _batch(7), _batch(9)])
+        subscription.close()
+
+    def test_subscribers_share_a_feed(self):
+        first = self.subscribe()
+        second = self.subscribe()
+        self.assertIs(first.feed, second.feed)
+
+        first.close()
+        self.assertIs(self.subscribe().feed, second.feed)
+
+    def test_feeds_stop_without_subscribers(self):
+        subscription = self.subscribe()
+        subscription.close()
+        self.assertTrue(subscription.feed._stopped.is_set())
+        self.assertIsNot(self.subscribe().feed, subscription.feed)
+
+    def test_forked_processes_get_their_own_hub(self):
+        hub, hub_pid = status_events._HUB, status_events._HUB_PID
+        subscribe = status_events.change_bus.subscribe
+        db_string = os.environ.get('PTERO_WORKFLOW_DB_STRING')
+        try:
+            status_events.change_bus.subscribe = lambda callback: None
+            os.environ['PTERO_WORKFLOW_DB_STRING'] = 'postgresql:///test'
+            # as if the hub had been created before this process forked
+            status_events._HUB = self.hub
+            status_events._HUB_PID = os.getpid() + 1
+
+            child_hub = status_events._get_hub()
+            self.assertIsNot(child_hub, self.hub)
+            self.assertIs(status_events._get_hub(), child_hub)
+        finally:
+            status_events._HUB, status_events._HUB_PID = hub, hub_pid
+            status_events.change_bus.subscribe = subscribe
+            if db_string is None:
+                del os.environ['PTERO_WORKFLOW_DB_STRING']
+            else:
+                os.environ['PTERO_WORKFLOW_DB_STRING'] = db_string